@@ -0,0 +1,1009 @@
+"""Benchmarks for the public functions in more_itertools.
+
+Each benchmark case runs one function to completion over an input of a
+nominal size. Run the suite from the root of the repository::
+
+    python benchmarks/bench.py
+
+Useful options:
+
+* ``--sizes 100 10000`` sets the input sizes to sweep over.
+* ``--filter window`` only runs the cases whose names contain "window".
+* ``--min-time 0.01`` makes each timing measurement shorter, and less
+  precise.
+* ``--memory`` also records the peak memory used by each case (this
+  requires ``tracemalloc``, which is available on Python 3.4+).
+* ``--save results.json`` stores the results so they can be used as a
+  baseline later.
+* ``--compare results.json`` reports how the results differ from a stored
+  baseline. The exit status is 1 if any case got slower (or used more memory)
+  by more than ``--threshold``, which is 0.1 (10%) by default.
+
+"""
+from __future__ import division, print_function
+
+from argparse import ArgumentParser
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from io import BytesIO
+from json import dump, load
+from math import factorial
+from operator import add, itemgetter, mul
+from os.path import abspath, dirname
+from platform import python_implementation, python_version
+from random import Random
+from timeit import default_timer
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Benchmark the working copy rather than an installed version
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import more_itertools as mi  # noqa: E402
+from more_itertools import consume  # noqa: E402
+
+CASES = {}
+MIN_TIME = 0.2
+REPEAT = 5
+
+
+def case(name=None):
+    """Register a benchmark case. The decorated function accepts the input
+    size and returns a function that takes no arguments and does the work
+    being measured.
+
+    """
+    def decorator(func):
+        CASES[name or func.__name__] = func
+        return func
+
+    return decorator
+
+
+def data(n):
+    return list(range(n))
+
+
+def shuffled(n):
+    ret = data(n)
+    Random(n).shuffle(ret)
+    return ret
+
+
+def text(n):
+    return ''.join(chr(ord('a') + (i * i) % 26) for i in range(n))
+
+
+def is_odd(x):
+    return x % 2
+
+
+# Cases for more.py
+
+
+@case()
+def adjacent(n):
+    items = data(n)
+    return lambda: consume(mi.adjacent(lambda x: x % 10 == 0, items))
+
+
+@case()
+def always_iterable(n):
+    items = data(n)
+    return lambda: consume(mi.always_iterable(x) for x in items)
+
+
+@case()
+def always_reversible(n):
+    items = data(n)
+    return lambda: consume(mi.always_reversible(iter(items)))
+
+
+@case()
+def BloomFilter(n):
+    items = [i % (n // 4 + 1) for i in shuffled(n)]
+    return lambda: consume(
+        mi.unique_everseen(items, seen=mi.BloomFilter(n // 4 + 1))
+    )
+
+
+@case()
+def bucket(n):
+    items = data(n)
+
+    def run():
+        b = mi.bucket(items, key=lambda x: x % 10)
+        for k in range(10):
+            consume(b[k])
+
+    return run
+
+
+@case()
+def chunked(n):
+    items = data(n)
+    return lambda: consume(mi.chunked(items, 16))
+
+
+@case()
+def circular_shifts(n):
+    items = data(min(n, 1000))
+    return lambda: consume(mi.circular_shifts(items))
+
+
+@case()
+def collapse(n):
+    items = [[i, (i, [i, 'x'])] for i in range(n // 4)]
+    return lambda: consume(mi.collapse(items))
+
+
+@case()
+def collate(n):
+    items = [data(n // 4)] * 4
+    return lambda: consume(mi.collate(*items))
+
+
+@case()
+def combination_index(n):
+    items = data(n)
+    element = items[::3]
+    return lambda: mi.combination_index(element, items)
+
+
+@case()
+def consecutive_groups(n):
+    items = [i + i // 10 for i in range(n)]
+    return lambda: consume(
+        consume(group) for group in mi.consecutive_groups(items)
+    )
+
+
+@case()
+def consumer(n):
+    def gen():
+        while True:
+            yield
+
+    def run():
+        c = mi.consumer(gen)()
+        for i in range(n):
+            c.send(i)
+
+    return run
+
+
+@case()
+def CountMinSketch(n):
+    items = shuffled(n)
+
+    def run():
+        c = mi.CountMinSketch(1024)
+        for item in items:
+            c.add(item)
+
+    return run
+
+
+@case()
+def count_cycle(n):
+    items = data(10)
+    return lambda: consume(mi.count_cycle(items, n // 10))
+
+
+@case()
+def difference(n):
+    items = data(n)
+    return lambda: consume(mi.difference(items))
+
+
+@case()
+def distinct_permutation_index(n):
+    items = [i % 4 for i in range(min(n, 1000))]
+    element = sorted(items, reverse=True)
+    return lambda: mi.distinct_permutation_index(element, items)
+
+
+@case()
+def distinct_permutations(n):
+    items = [i % 4 for i in range(12)]
+    return lambda: consume(
+        mi.take(n, mi.distinct_permutations(items))
+    )
+
+
+@case()
+def distribute(n):
+    items = data(n)
+    return lambda: consume(consume(c) for c in mi.distribute(4, items))
+
+
+@case()
+def divide(n):
+    items = data(n)
+    return lambda: consume(consume(c) for c in mi.divide(4, items))
+
+
+@case()
+def fanout(n):
+    items = data(n)
+    sinks = {k: (lambda x: None) for k in range(10)}
+    return lambda: mi.fanout(items, lambda x: x % 10, sinks)
+
+
+@case()
+def exactly_n(n):
+    items = data(n)
+    return lambda: mi.exactly_n(items, n - 1)
+
+
+@case()
+def first(n):
+    items = data(n)
+    return lambda: consume(mi.first(items) for _ in range(n))
+
+
+@case()
+def groupby_transform(n):
+    items = data(n)
+    return lambda: consume(
+        consume(g) for k, g in mi.groupby_transform(
+            items, lambda x: x // 10, lambda x: -x
+        )
+    )
+
+
+@case()
+def ilen(n):
+    items = data(n)
+    return lambda: mi.ilen(iter(items))
+
+
+@case()
+def interleave(n):
+    items = [data(n // 4)] * 4
+    return lambda: consume(mi.interleave(*items))
+
+
+@case()
+def interleave_longest(n):
+    items = [data(n // 4), data(n // 8)]
+    return lambda: consume(mi.interleave_longest(*items))
+
+
+@case()
+def intersperse(n):
+    items = data(n)
+    return lambda: consume(mi.intersperse(None, items, 2))
+
+
+@case()
+def islice_extended(n):
+    items = data(n)
+    return lambda: consume(mi.islice_extended(items, -n // 2, None, -2))
+
+
+@case()
+def iterate(n):
+    return lambda: consume(mi.take(n, mi.iterate(lambda x: x + 1, 0)))
+
+
+@case()
+def last(n):
+    items = data(n)
+    return lambda: mi.last(iter(items))
+
+
+@case()
+def locate(n):
+    items = data(n)
+    return lambda: consume(mi.locate(items, is_odd))
+
+
+@case()
+def LRUSet(n):
+    items = [i % (n // 4 + 1) for i in shuffled(n)]
+    return lambda: consume(mi.unique_everseen(items, seen=mi.LRUSet(100)))
+
+
+@case()
+def lstrip(n):
+    items = data(n)
+    return lambda: consume(mi.lstrip(items, lambda x: x < n // 2))
+
+
+@case()
+def make_decorator(n):
+    decorator = mi.make_decorator(mi.chunked, result_index=0)
+    items = data(n)
+
+    @decorator(4)
+    def func():
+        return items
+
+    return lambda: consume(func())
+
+
+@case()
+def map_reduce(n):
+    items = data(n)
+    return lambda: mi.map_reduce(items, lambda x: x % 100, reducefunc=sum)
+
+
+@case()
+def ngram_counts(n):
+    items = text(n)
+    return lambda: mi.ngram_counts(items, range(1, 4))
+
+
+@case()
+def ngram_counts_sketch(n):
+    items = text(n)
+    return lambda: mi.ngram_counts(items, range(1, 4), width=1024)
+
+
+@case()
+def ngram_counts_windowed(n):
+    # The baseline for ngram_counts
+    items = text(n)
+
+    def run():
+        ret = Counter()
+        for size in range(1, 4):
+            ret.update(mi.windowed(items, size))
+        return ret
+
+    return run
+
+
+@case()
+def nth_distinct_permutation(n):
+    items = [i % 4 for i in range(min(n, 1000))]
+    last = sorted(items, reverse=True)
+    index = mi.distinct_permutation_index(last, items) // 2
+    return lambda: mi.nth_distinct_permutation(items, len(items), index)
+
+
+@case()
+def nth_permutation(n):
+    items = data(min(n, 1000))
+    index = factorial(len(items)) // 2
+    return lambda: mi.nth_permutation(items, len(items), index)
+
+
+@case()
+def nth_powerset(n):
+    items = data(min(n, 1000))
+    return lambda: mi.nth_powerset(items, 2 ** (len(items) // 2))
+
+
+@case()
+def nth_product(n):
+    args = [range(10)] * min(n, 1000)
+    index = 10 ** len(args) // 2
+    return lambda: mi.nth_product(index, *args)
+
+
+@case()
+def numeric_range(n):
+    return lambda: consume(mi.numeric_range(0, n / 10, 0.1))
+
+
+@case()
+def one(n):
+    items = [[i] for i in range(n)]
+    return lambda: consume(mi.one(x) for x in items)
+
+
+@case()
+def padded(n):
+    items = data(n)
+    return lambda: consume(mi.padded(items, None, 2 * n))
+
+
+@case()
+def parallel_map(n):
+    items = data(n)
+    return lambda: consume(
+        mi.parallel_map(abs, items, chunk_size=256, threads=True)
+    )
+
+
+@case()
+def peekable(n):
+    items = data(n)
+
+    def run():
+        p = mi.peekable(items)
+        for _ in p:
+            p.peek(None)
+
+    return run
+
+
+@case()
+def permutation_index(n):
+    items = data(min(n, 1000))
+    element = items[::-1]
+    return lambda: mi.permutation_index(element, items)
+
+
+@case()
+def powerset_index(n):
+    items = data(min(n, 1000))
+    element = items[::2]
+    return lambda: mi.powerset_index(element, items)
+
+
+@case()
+def product_index(n):
+    args = [range(10)] * min(n, 1000)
+    element = [i % 10 for i in range(len(args))]
+    return lambda: mi.product_index(element, *args)
+
+
+@case()
+def read_records(n):
+    items = text(n).encode('ascii')
+    return lambda: consume(mi.read_records(BytesIO(items), delimiter=b'a'))
+
+
+@case()
+def replace(n):
+    items = data(n)
+    return lambda: consume(mi.replace(items, is_odd, [None, None]))
+
+
+@case()
+def rlocate(n):
+    items = data(n)
+    return lambda: consume(mi.rlocate(items, is_odd))
+
+
+@case()
+def rstrip(n):
+    items = data(n)
+    return lambda: consume(mi.rstrip(items, lambda x: x > n // 2))
+
+
+@case()
+def run_length(n):
+    items = [i // 10 for i in range(n)]
+    return lambda: consume(
+        mi.run_length.decode(mi.run_length.encode(items))
+    )
+
+
+@case()
+def seekable(n):
+    items = data(n)
+
+    def run():
+        s = mi.seekable(items)
+        consume(s)
+        s.seek(0)
+        consume(s)
+
+    return run
+
+
+@case()
+def SequenceView(n):
+    items = data(n)
+    return lambda: consume(mi.SequenceView(items))
+
+
+@case()
+def side_effect(n):
+    items = data(n)
+    return lambda: consume(mi.side_effect(abs, items))
+
+
+@case()
+def sliced(n):
+    items = data(n)
+    return lambda: consume(mi.sliced(items, 16))
+
+
+@case()
+def sort_together(n):
+    items = [shuffled(n), data(n)]
+    return lambda: mi.sort_together(items)
+
+
+@case()
+def sort_together_max_run(n):
+    items = [shuffled(n), data(n)]
+    return lambda: consume(mi.sort_together(items, max_run=1000))
+
+
+@case()
+def split_at(n):
+    items = data(n)
+    return lambda: consume(mi.split_at(items, lambda x: x % 10 == 0))
+
+
+@case()
+def split_after(n):
+    items = data(n)
+    return lambda: consume(mi.split_after(items, lambda x: x % 10 == 0))
+
+
+@case()
+def split_before(n):
+    items = data(n)
+    return lambda: consume(mi.split_before(items, lambda x: x % 10 == 0))
+
+
+@case()
+def split_into(n):
+    items = data(n)
+    sizes = [10] * (n // 10)
+    return lambda: consume(mi.split_into(items, sizes))
+
+
+@case()
+def spy(n):
+    items = data(n)
+
+    def run():
+        head, it = mi.spy(items, 10)
+        consume(it)
+
+    return run
+
+
+@case()
+def stagger(n):
+    items = data(n)
+    return lambda: consume(mi.stagger(items))
+
+
+@case()
+def strip(n):
+    items = data(n)
+    return lambda: consume(mi.strip(items, lambda x: x < 10 or x > n - 10))
+
+
+@case()
+def substrings(n):
+    items = text(min(n, 300))
+    return lambda: consume(mi.substrings(items))
+
+
+@case()
+def unique_in_window(n):
+    items = [i % 100 for i in shuffled(n)]
+    return lambda: consume(mi.unique_in_window(items, 50))
+
+
+@case()
+def unique_to_each(n):
+    items = [data(n // 2), shuffled(n // 2), data(n // 4)]
+    return lambda: mi.unique_to_each(*items)
+
+
+@case()
+def unzip(n):
+    items = [(i, i, i) for i in range(n)]
+    return lambda: consume(consume(it) for it in mi.unzip(items))
+
+
+@case()
+def windowed(n):
+    items = data(n)
+    return lambda: consume(mi.windowed(items, 16))
+
+
+@case()
+def windowed_view(n):
+    items = data(n)
+    return lambda: consume(mi.windowed_view(items, 16))
+
+
+@case()
+def with_iter(n):
+    @contextmanager
+    def manager():
+        yield iter(data(n))
+
+    return lambda: consume(mi.with_iter(manager()))
+
+
+@case()
+def zip_offset(n):
+    items = data(n)
+    return lambda: consume(mi.zip_offset(items, items, offsets=(0, 1)))
+
+
+# Cases for recipes.py
+
+
+@case()
+def accumulate(n):
+    items = data(n)
+    return lambda: consume(mi.accumulate(items))
+
+
+@case()
+def all_equal(n):
+    items = [0] * n
+    return lambda: mi.all_equal(items)
+
+
+@case('consume')
+def consume_(n):
+    items = data(n)
+    return lambda: consume(iter(items))
+
+
+@case()
+def dotproduct(n):
+    items = data(n)
+    return lambda: mi.dotproduct(items, items)
+
+
+@case()
+def first_true(n):
+    items = [0] * n + [1]
+    return lambda: mi.first_true(items)
+
+
+@case()
+def flatten(n):
+    items = [[i, i] for i in range(n // 2)]
+    return lambda: consume(mi.flatten(items))
+
+
+@case()
+def grouper(n):
+    items = data(n)
+    return lambda: consume(mi.grouper(items, 16))
+
+
+@case()
+def iter_except(n):
+    def run():
+        items = data(n)
+        consume(mi.iter_except(items.pop, IndexError))
+
+    return run
+
+
+@case()
+def ncycles(n):
+    items = data(10)
+    return lambda: consume(mi.ncycles(items, n // 10))
+
+
+@case()
+def nth(n):
+    items = data(n)
+    return lambda: mi.nth(items, n - 1)
+
+
+@case()
+def nth_combination(n):
+    items = data(min(n, 1000))
+    r = len(items) // 2
+    index = factorial(len(items)) // (factorial(r) * factorial(len(items) - r))
+    return lambda: mi.nth_combination(items, r, index // 2)
+
+
+@case()
+def padnone(n):
+    items = data(n)
+    return lambda: consume(mi.take(2 * n, mi.padnone(items)))
+
+
+@case()
+def pairwise(n):
+    items = data(n)
+    return lambda: consume(mi.pairwise(items))
+
+
+@case()
+def partition(n):
+    items = data(n)
+    return lambda: consume(consume(it) for it in mi.partition(is_odd, items))
+
+
+@case()
+def powerset(n):
+    items = data(20)
+    return lambda: consume(mi.take(n, mi.powerset(items)))
+
+
+@case()
+def prepend(n):
+    items = data(n)
+    return lambda: consume(mi.prepend(None, items))
+
+
+@case()
+def quantify(n):
+    items = data(n)
+    return lambda: mi.quantify(items, is_odd)
+
+
+@case()
+def random_combination_with_replacement(n):
+    items = data(n)
+    return lambda: mi.random_combination_with_replacement(items, n // 2)
+
+
+@case()
+def random_combination(n):
+    items = data(n)
+    return lambda: mi.random_combination(items, n // 2)
+
+
+@case()
+def random_permutation(n):
+    items = data(n)
+    return lambda: mi.random_permutation(items)
+
+
+@case()
+def random_product(n):
+    args = [range(10)] * n
+    return lambda: mi.random_product(*args)
+
+
+@case()
+def repeatfunc(n):
+    return lambda: consume(mi.repeatfunc(add, n, 1, 2))
+
+
+@case()
+def roundrobin(n):
+    items = [data(n // 4), data(n // 2), data(n // 4)]
+    return lambda: consume(mi.roundrobin(*items))
+
+
+@case()
+def tabulate(n):
+    return lambda: consume(mi.take(n, mi.tabulate(partial(mul, 2))))
+
+
+@case()
+def tail(n):
+    items = data(n)
+    return lambda: consume(mi.tail(10, items))
+
+
+@case()
+def take(n):
+    items = data(n)
+    return lambda: mi.take(n, items)
+
+
+@case()
+def unique_everseen(n):
+    items = [i % (n // 4 + 1) for i in shuffled(n)]
+    return lambda: consume(mi.unique_everseen(items))
+
+
+@case()
+def unique_justseen(n):
+    items = [i // 4 for i in range(n)]
+    return lambda: consume(mi.unique_justseen(items))
+
+
+def missing_cases():
+    """Return the public names in more_itertools without a benchmark case."""
+    return sorted(set(mi.more.__all__ + mi.recipes.__all__) - set(CASES))
+
+
+def measure_time(func, min_time=MIN_TIME):
+    """Return the best time (in seconds) for one call of *func*.
+
+    The number of calls per measurement grows until a measurement takes at
+    least *min_time* seconds, then the best of ``REPEAT`` measurements is
+    used.
+
+    """
+    number = 1
+    while True:
+        start = default_timer()
+        for _ in range(number):
+            func()
+        elapsed = default_timer() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < (min_time / 10) else 2
+
+    best = elapsed
+    for _ in range(REPEAT - 1):
+        start = default_timer()
+        for _ in range(number):
+            func()
+        best = min(best, default_timer() - start)
+
+    return best / number
+
+
+def measure_peak(func):
+    """Return the peak memory (in bytes) allocated during one call of
+    *func*.
+
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return peak - before
+
+
+def run(names, sizes, memory=False, min_time=MIN_TIME, stream=sys.stdout):
+    """Run the cases in *names* for each of the input *sizes*, printing
+    progress to *stream*. Return a dictionary mapping ``name[size]`` keys to
+    measurements.
+
+    """
+    results = {}
+    for name in names:
+        for n in sizes:
+            func = CASES[name](n)
+            key = '{}[{}]'.format(name, n)
+            result = {'time': measure_time(func, min_time)}
+            if memory:
+                result['peak'] = measure_peak(func)
+            results[key] = result
+            print(format_result(key, result), file=stream)
+
+    return results
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '{:.3g} {}'.format(seconds / scale, unit)
+
+    return '{:.3g} ns'.format(seconds / 1e-9)
+
+
+def format_bytes(size):
+    for unit, scale in (('MiB', 2 ** 20), ('KiB', 2 ** 10)):
+        if size >= scale:
+            return '{:.3g} {}'.format(size / scale, unit)
+
+    return '{} B'.format(size)
+
+
+def format_result(key, result):
+    ret = '{:<48} {:>10}'.format(key, format_time(result['time']))
+    if 'peak' in result:
+        ret += ' {:>10}'.format(format_bytes(result['peak']))
+    return ret
+
+
+def compare(results, baseline, threshold):
+    """Compare *results* against *baseline* and return a list of
+    ``(key, metric, old, new, ratio)`` tuples sorted from the worst
+    regression to the best improvement, and the list of regressions: the
+    entries whose ratio exceeds ``1 + threshold``.
+
+    """
+    rows = []
+    for key, result in results.items():
+        old_result = baseline.get(key)
+        if old_result is None:
+            continue
+        for metric in ('time', 'peak'):
+            if (metric not in result) or (metric not in old_result):
+                continue
+            old, new = old_result[metric], result[metric]
+            ratio = (new / old) if old else float(new > 0) + 1
+            rows.append((key, metric, old, new, ratio))
+
+    rows.sort(key=itemgetter(4), reverse=True)
+    regressions = [row for row in rows if row[4] > 1 + threshold]
+    return rows, regressions
+
+
+def print_report(rows, regressions, threshold, stream=sys.stdout):
+    formatters = {'time': format_time, 'peak': format_bytes}
+    print(file=stream)
+    print('Comparison with baseline:', file=stream)
+    for key, metric, old, new, ratio in rows:
+        fmt = formatters[metric]
+        flag = ' <-- regression' if ratio > 1 + threshold else ''
+        print(
+            '{:<48} {:<5} {:>10} -> {:>10} ({:+.1%}){}'.format(
+                key, metric, fmt(old), fmt(new), ratio - 1, flag
+            ),
+            file=stream
+        )
+
+    print(file=stream)
+    if regressions:
+        print(
+            '{} of {} measurements regressed by more than {:.0%}'.format(
+                len(regressions), len(rows), threshold
+            ),
+            file=stream
+        )
+    else:
+        print('No regressions of more than {:.0%}'.format(threshold),
+              file=stream)
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Benchmark more_itertools.')
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[100, 10000],
+        help='input sizes to sweep over'
+    )
+    parser.add_argument(
+        '--filter', default='',
+        help='only run cases whose names contain this string'
+    )
+    parser.add_argument(
+        '--memory', action='store_true',
+        help='also measure peak memory use with tracemalloc'
+    )
+    parser.add_argument(
+        '--min-time', type=float, default=MIN_TIME,
+        help='minimum duration of each timing measurement, in seconds'
+    )
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument(
+        '--compare', help='compare the results with this baseline file'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='relative slowdown that counts as a regression'
+    )
+    args = parser.parse_args(argv)
+
+    if args.memory and (tracemalloc is None):
+        parser.error('--memory requires tracemalloc (Python 3.4+)')
+
+    missing = missing_cases()
+    if missing:
+        print('No benchmark cases for: {}'.format(', '.join(missing)))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as infile:
+            baseline = load(infile)['results']
+
+    names = sorted(name for name in CASES if args.filter in name)
+    results = run(
+        names, args.sizes, memory=args.memory, min_time=args.min_time
+    )
+
+    if args.save:
+        with open(args.save, 'w') as outfile:
+            dump(
+                {
+                    'python': '{} {}'.format(
+                        python_implementation(), python_version()
+                    ),
+                    'results': results,
+                },
+                outfile,
+                indent=2,
+                sort_keys=True,
+            )
+
+    if baseline is not None:
+        rows, regressions = compare(results, baseline, args.threshold)
+        print_report(rows, regressions, args.threshold)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,456 @@
+"""Asynchronous counterparts of some of the tools in :mod:`more_itertools`.
+
+Each function accepts asynchronous iterables (objects with an ``__aiter__``
+method) as well as ordinary ones, and behaves like the synchronous version
+with the same name. Functions that return a single value are coroutines.
+
+This module requires Python 3.7 or greater, and isn't imported by
+``more_itertools`` itself.
+
+"""
+import asyncio
+from collections import defaultdict, deque
+from inspect import isawaitable
+from operator import gt, lt
+from time import monotonic
+
+from .more import _marker, _sift_down
+
+__all__ = [
+    'bucket',
+    'chunked',
+    'collate',
+    'first',
+    'ilen',
+    'interleave',
+    'peekable',
+    'side_effect',
+    'spy',
+    'windowed',
+]
+
+
+async def _iterate(iterable):
+    for item in iterable:
+        yield item
+
+
+async def _anext(it):
+    return await it.__anext__()
+
+
+def _aiter(iterable):
+    """Return an asynchronous iterator over *iterable*, which may be an
+    asynchronous or an ordinary iterable.
+
+    """
+    try:
+        aiter = type(iterable).__aiter__
+    except AttributeError:
+        return _iterate(iterable)
+    return aiter(iterable)
+
+
+async def chunked(iterable, n, max_wait=None):
+    """Break *iterable* into lists of length *n*:
+
+        >>> async def main():
+        ...     return [chunk async for chunk in chunked(range(8), 3)]
+        >>> asyncio.run(main())
+        [[0, 1, 2], [3, 4, 5], [6, 7]]
+
+    If *max_wait* is given, a list will also be emitted once that many
+    seconds have passed since its first item arrived, even if it has fewer
+    than *n* items. This is useful for batching items from a source that
+    produces them irregularly.
+
+    """
+    if n < 1:
+        raise ValueError('n must be at least 1')
+
+    it = _aiter(iterable)
+    if max_wait is None:
+        chunk = []
+        async for item in it:
+            chunk.append(item)
+            if len(chunk) == n:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+
+    # The next item is fetched in a task, so waiting for it can time out
+    # without losing the item.
+    task = None
+    try:
+        while True:
+            chunk = []
+            deadline = None
+            while len(chunk) < n:
+                if task is None:
+                    task = asyncio.ensure_future(_anext(it))
+                if deadline is not None:
+                    timeout = deadline - monotonic()
+                    if timeout <= 0:
+                        break
+                    await asyncio.wait((task,), timeout=timeout)
+                    if not task.done():
+                        break
+
+                try:
+                    item = await task
+                except StopAsyncIteration:
+                    if chunk:
+                        yield chunk
+                    return
+                finally:
+                    if task.done():
+                        task = None
+
+                chunk.append(item)
+                if deadline is None:
+                    deadline = monotonic() + max_wait
+
+            yield chunk
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+async def windowed(seq, n, fillvalue=None, step=1):
+    """Return a sliding window of width *n* over the given iterable.
+
+        >>> async def main():
+        ...     return [w async for w in windowed([1, 2, 3, 4, 5], 3)]
+        >>> asyncio.run(main())
+        [(1, 2, 3), (2, 3, 4), (3, 4, 5)]
+
+    *fillvalue* and *step* behave as they do for
+    :func:`more_itertools.windowed`.
+
+    """
+    if n < 0:
+        raise ValueError('n must be >= 0')
+    if n == 0:
+        yield tuple()
+        return
+    if step < 1:
+        raise ValueError('step must be >= 1')
+
+    it = _aiter(seq)
+    window = deque([], n)
+    append = window.append
+
+    # Initial deque fill
+    async for item in it:
+        append(item)
+        if len(window) == n:
+            break
+    for _ in range(n - len(window)):
+        append(fillvalue)
+    yield tuple(window)
+
+    # Appending new items to the right causes old items to fall off the left
+    i = 0
+    async for item in it:
+        append(item)
+        i = (i + 1) % step
+        if i % step == 0:
+            yield tuple(window)
+
+    # If there are items from the iterable in the window, pad with the given
+    # value and emit them.
+    if (i % step) and (step - i < n):
+        for _ in range(step - i):
+            append(fillvalue)
+        yield tuple(window)
+
+
+class peekable:
+    """Wrap an asynchronous iterator to allow lookahead and prepending
+    elements:
+
+        >>> async def main():
+        ...     p = peekable(['a', 'b'])
+        ...     return await p.peek(), await p.__anext__(), await p.peek()
+        >>> asyncio.run(main())
+        ('a', 'a', 'b')
+
+    :meth:`peek` accepts a default value to return instead of raising
+    ``StopAsyncIteration`` when the iterator is exhausted.
+    :meth:`prepend` "inserts" items at the head of the iterable.
+
+    """
+    def __init__(self, iterable):
+        self._it = _aiter(iterable)
+        self._cache = deque()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._cache:
+            return self._cache.popleft()
+
+        return await self._it.__anext__()
+
+    async def peek(self, default=_marker):
+        """Return the item that will be next returned from ``__anext__()``.
+
+        Return ``default`` if there are no items left. If ``default`` is not
+        provided, raise ``StopAsyncIteration``.
+
+        """
+        if not self._cache:
+            try:
+                self._cache.append(await self._it.__anext__())
+            except StopAsyncIteration:
+                if default is _marker:
+                    raise
+                return default
+        return self._cache[0]
+
+    def prepend(self, *items):
+        """Stack up items to be the next ones returned from ``__anext__()``
+        or ``peek()``, in first in, first out order.
+
+        """
+        self._cache.extendleft(reversed(items))
+
+
+async def _spy_chain(head, it):
+    for item in head:
+        yield item
+    async for item in it:
+        yield item
+
+
+async def spy(iterable, n=1):
+    """Return a 2-tuple with a list containing the first *n* elements of
+    *iterable*, and an asynchronous iterator with the same items as
+    *iterable*:
+
+        >>> async def main():
+        ...     head, iterable = await spy('abcdefg', 2)
+        ...     return head, [x async for x in iterable]
+        >>> asyncio.run(main())
+        (['a', 'b'], ['a', 'b', 'c', 'd', 'e', 'f', 'g'])
+
+    """
+    it = _aiter(iterable)
+    head = []
+    if n > 0:
+        async for item in it:
+            head.append(item)
+            if len(head) == n:
+                break
+
+    return head, _spy_chain(list(head), it)
+
+
+async def first(iterable, default=_marker):
+    """Return the first item of *iterable*, or *default* if *iterable* is
+    empty:
+
+        >>> asyncio.run(first([0, 1, 2, 3]))
+        0
+        >>> asyncio.run(first([], 'some default'))
+        'some default'
+
+    If *default* is not provided and there are no items in the iterable,
+    raise ``ValueError``.
+
+    """
+    async for item in _aiter(iterable):
+        return item
+
+    if default is _marker:
+        raise ValueError('first() was called on an empty iterable, and no '
+                         'default value was provided.')
+    return default
+
+
+async def ilen(iterable):
+    """Return the number of items in *iterable*:
+
+        >>> asyncio.run(ilen(x for x in range(1000000) if x % 3 == 0))
+        333334
+
+    This consumes the iterable, so handle with care.
+
+    """
+    n = 0
+    async for _ in _aiter(iterable):
+        n += 1
+    return n
+
+
+async def interleave(*iterables):
+    """Yield from each iterable in turn, until the shortest is exhausted:
+
+        >>> async def main():
+        ...     it = interleave([1, 2, 3], [4, 5], [6, 7, 8])
+        ...     return [x async for x in it]
+        >>> asyncio.run(main())
+        [1, 4, 6, 2, 5, 7]
+
+    """
+    iterators = [_aiter(it) for it in iterables]
+    if not iterators:
+        return
+
+    while True:
+        group = []
+        for it in iterators:
+            try:
+                group.append(await it.__anext__())
+            except StopAsyncIteration:
+                return
+        for item in group:
+            yield item
+
+
+async def collate(*iterables, key=None, reverse=False):
+    """Return a sorted merge of the items from each of several already-sorted
+    *iterables*:
+
+        >>> async def main():
+        ...     return [x async for x in collate('ACDZ', 'AZ', 'JKL')]
+        >>> asyncio.run(main())
+        ['A', 'A', 'C', 'D', 'J', 'K', 'L', 'Z', 'Z']
+
+    *key* and *reverse* behave as they do for
+    :func:`more_itertools.collate`, and the same heap-based merge is used.
+
+    """
+    before = gt if reverse else lt
+    direction = -1 if reverse else 1
+
+    heap = []
+    for order, it in enumerate(iterables):
+        it = _aiter(it)
+        try:
+            item = await it.__anext__()
+        except StopAsyncIteration:
+            continue
+        k = item if (key is None) else key(item)
+        heap.append([k, order * direction, item, it])
+
+    for pos in reversed(range(len(heap) // 2)):
+        _sift_down(heap, pos, before)
+
+    while heap:
+        entry = heap[0]
+        yield entry[2]
+        try:
+            item = await entry[3].__anext__()
+        except StopAsyncIteration:
+            last = heap.pop()
+            if not heap:
+                break
+            heap[0] = last
+        else:
+            entry[0] = item if (key is None) else key(item)
+            entry[2] = item
+        _sift_down(heap, 0, before)
+
+
+class bucket:
+    """Wrap *iterable* and return an object that buckets it into child
+    asynchronous iterables based on a *key* function:
+
+        >>> async def main():
+        ...     s = bucket(['a1', 'b1', 'c1', 'a2', 'b2'], key=lambda x: x[0])
+        ...     return [x async for x in s['a']], [x async for x in s['b']]
+        >>> asyncio.run(main())
+        (['a1', 'a2'], ['b1', 'b2'])
+
+    As with :class:`more_itertools.bucket`, items that don't match the
+    child being iterated over are cached until they're needed. If a
+    *validator* function is given, only items whose keys it accepts are
+    cached. Child iterables may be consumed by concurrent tasks.
+
+    """
+    def __init__(self, iterable, key, validator=None):
+        self._it = _aiter(iterable)
+        self._key = key
+        self._cache = defaultdict(deque)
+        self._validator = validator or (lambda x: True)
+        # Before Python 3.10 a lock is bound to the event loop that's current
+        # when it's created, so it's created by the first child to run.
+        self._lock = None
+
+    async def _get_values(self, value):
+        while True:
+            # If we've cached some items that match the target value, emit
+            # the first one and evict it from the cache.
+            if self._cache[value]:
+                yield self._cache[value].popleft()
+                continue
+
+            # Otherwise we need to advance the parent iterator to search for
+            # a matching item, caching the rest. Only one child may do that
+            # at a time.
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._cache[value]:
+                    continue
+                while True:
+                    try:
+                        item = await self._it.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    item_value = self._key(item)
+                    if item_value == value:
+                        break
+                    elif self._validator(item_value):
+                        self._cache[item_value].append(item)
+            yield item
+
+    def __getitem__(self, value):
+        if not self._validator(value):
+            return _iterate(())
+
+        return self._get_values(value)
+
+
+async def side_effect(func, iterable, chunk_size=None, before=None,
+                      after=None):
+    """Invoke *func* on each item in *iterable* (or on each *chunk_size* group
+    of items) before yielding the item:
+
+        >>> async def main():
+        ...     seen = []
+        ...     items = [x async for x in side_effect(seen.append, range(3))]
+        ...     return items, seen
+        >>> asyncio.run(main())
+        ([0, 1, 2], [0, 1, 2])
+
+    *func*, *before*, and *after* may be ordinary functions or coroutine
+    functions. As with :func:`more_itertools.side_effect`, *before* and
+    *after* are called before iteration starts and after it ends.
+
+    """
+    async def call(f, *args):
+        result = f(*args)
+        if isawaitable(result):
+            await result
+
+    try:
+        if before is not None:
+            await call(before)
+
+        if chunk_size is None:
+            async for item in _aiter(iterable):
+                await call(func, item)
+                yield item
+        else:
+            async for chunk in chunked(iterable, chunk_size):
+                await call(func, chunk)
+                for item in chunk:
+                    yield item
+    finally:
+        if after is not None:
+            await call(after)
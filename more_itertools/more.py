@@ -1,8 +1,10 @@
 from __future__ import print_function
 
-from collections import Counter, defaultdict, deque
+from array import array
+from collections import Counter, OrderedDict, defaultdict, deque
 from functools import partial, wraps
-from heapq import merge
+from heapq import merge, nlargest
+from math import ceil, log
 from itertools import (
     chain,
     compress,
@@ -17,34 +19,45 @@ from itertools import (
     tee
 )
 from operator import itemgetter, lt, gt, sub
+from pickle import HIGHEST_PROTOCOL, Pickler, Unpickler, dump, load
+from struct import Struct
 from sys import maxsize, version_info
+from tempfile import TemporaryFile
+from threading import Lock
 try:
     from collections.abc import Sequence
 except ImportError:
     from collections import Sequence
 
-from six import binary_type, string_types, text_type
+from six import binary_type, integer_types, string_types, text_type
 from six.moves import filter, map, range, zip, zip_longest
 
-from .recipes import consume, flatten, take
+from .recipes import (
+    _freeze, _numeric_ndarray, consume, flatten, nth_combination, take
+)
 
 __all__ = [
     'adjacent',
     'always_iterable',
     'always_reversible',
+    'BloomFilter',
     'bucket',
     'chunked',
     'circular_shifts',
     'collapse',
     'collate',
+    'combination_index',
     'consecutive_groups',
     'consumer',
     'count_cycle',
+    'CountMinSketch',
     'difference',
+    'distinct_permutation_index',
     'distinct_permutations',
     'distribute',
     'divide',
     'exactly_n',
+    'fanout',
     'first',
     'groupby_transform',
     'ilen',
@@ -55,13 +68,24 @@ __all__ = [
     'iterate',
     'last',
     'locate',
+    'LRUSet',
     'lstrip',
     'make_decorator',
     'map_reduce',
+    'ngram_counts',
+    'nth_distinct_permutation',
+    'nth_permutation',
+    'nth_powerset',
+    'nth_product',
     'numeric_range',
     'one',
     'padded',
+    'parallel_map',
     'peekable',
+    'permutation_index',
+    'powerset_index',
+    'product_index',
+    'read_records',
     'replace',
     'rlocate',
     'rstrip',
@@ -79,9 +103,11 @@ __all__ = [
     'stagger',
     'strip',
     'substrings',
+    'unique_in_window',
     'unique_to_each',
     'unzip',
     'windowed',
+    'windowed_view',
     'with_iter',
     'zip_offset',
 ]
@@ -113,6 +139,117 @@ def chunked(iterable, n):
     return iter(partial(take, n, iter(iterable)), [])
 
 
+def _map_chunk(func, chunk):
+    """Helper for ``parallel_map()``. Lives at module level so it can be sent
+    to worker processes.
+
+    """
+    return list(map(func, chunk))
+
+
+def parallel_map(
+    func, iterable, chunk_size=1, workers=None, ordered=True, threads=False,
+    max_pending=None
+):
+    """Yield the results of calling *func* on each item of *iterable*, with
+    the calls spread across a pool of worker processes:
+
+        >>> list(parallel_map(abs, [-1, 2, -3, 4], chunk_size=2))
+        [1, 2, 3, 4]
+
+    The items are sent to the workers in lists of *chunk_size*, made with
+    :func:`chunked`. Larger chunks reduce the overhead of communicating with
+    the workers. *workers* sets the size of the pool; by default it's the
+    number of processors.
+
+    Set *threads* to ``True`` to use a pool of threads instead. Worker
+    processes require *func* and the items to support the :mod:`pickle`
+    protocol, but threads don't.
+
+    By default the results are in the same order as the items. Set *ordered*
+    to ``False`` to receive each chunk's results as soon as they're ready:
+
+        >>> sorted(parallel_map(abs, [-1, 2, -3, 4], ordered=False))
+        [1, 2, 3, 4]
+
+    Items are read from *iterable* only as results are consumed. At most
+    *max_pending* chunks will be submitted but not yet yielded at any time,
+    so memory use is bounded even for infinite iterables. By default it's
+    twice the number of workers.
+
+    If the returned iterator is closed before it's exhausted, the chunks that
+    haven't started are cancelled.
+
+    This function requires the :mod:`concurrent.futures` module, which is
+    in the standard library on Python 3. On Python 2.7, install the
+    ``futures`` backport.
+
+    """
+    try:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    except ImportError:
+        raise ImportError(
+            'parallel_map() requires the concurrent.futures module; on '
+            'Python 2.7 install the "futures" package'
+        )
+
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    if workers is None:
+        from multiprocessing import cpu_count
+
+        workers = cpu_count()
+    if max_pending is None:
+        max_pending = 2 * workers
+    elif max_pending < 1:
+        raise ValueError('max_pending must be at least 1')
+
+    executor_class = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    return _parallel_map(
+        executor_class, workers, func, iterable, chunk_size, ordered,
+        max_pending
+    )
+
+
+def _parallel_map(
+    executor_class, workers, func, iterable, chunk_size, ordered, max_pending
+):
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    pending = deque() if ordered else set()
+
+    def completed():
+        # Wait for the next chunk (or chunks) to finish, and remove them from
+        # the pending collection.
+        if ordered:
+            return [pending.popleft()]
+        done = wait(pending, return_when=FIRST_COMPLETED).done
+        pending.difference_update(done)
+        return done
+
+    with executor_class(workers) as executor:
+        try:
+            for chunk in chunked(iterable, chunk_size):
+                if len(pending) >= max_pending:
+                    for future in completed():
+                        for result in future.result():
+                            yield result
+
+                future = executor.submit(_map_chunk, func, chunk)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+
+            while pending:
+                for future in completed():
+                    for result in future.result():
+                        yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
 def first(iterable, default=_marker):
     """Return the first item of *iterable*, or *default* if *iterable* is
     empty.
@@ -229,7 +366,12 @@ class peekable(object):
     """
     def __init__(self, iterable):
         self._it = iter(iterable)
-        self._cache = deque()
+        # The cached items are self._cache[self._head:]. Items before the
+        # head have already been returned, and are discarded in bulk once
+        # they make up more than half of the list. This keeps indexing
+        # constant-time, which a deque's isn't.
+        self._cache = []
+        self._head = 0
 
     def __iter__(self):
         return self
@@ -252,14 +394,14 @@ class peekable(object):
         provided, raise ``StopIteration``.
 
         """
-        if not self._cache:
+        if self._head == len(self._cache):
             try:
                 self._cache.append(next(self._it))
             except StopIteration:
                 if default is _marker:
                     raise
                 return default
-        return self._cache[0]
+        return self._cache[self._head]
 
     def prepend(self, *items):
         """Stack up items to be the next ones returned from ``next()`` or
@@ -290,11 +432,29 @@ class peekable(object):
             StopIteration
 
         """
-        self._cache.extendleft(reversed(items))
+        head = self._head
+        if len(items) <= head:
+            # Re-use the space left by items that were already returned
+            self._head = head - len(items)
+            self._cache[self._head:head] = items
+        else:
+            self._cache[:head] = items
+            self._head = 0
 
     def __next__(self):
-        if self._cache:
-            return self._cache.popleft()
+        cache = self._cache
+        head = self._head
+        if head < len(cache):
+            item = cache[head]
+            head += 1
+            if head == len(cache):
+                del cache[:]
+                head = 0
+            elif head > (len(cache) // 2):
+                del cache[:head]
+                head = 0
+            self._head = head
+            return item
 
         return next(self._it)
 
@@ -320,40 +480,104 @@ class peekable(object):
         # point.
         else:
             n = min(max(start, stop) + 1, maxsize)
-            cache_len = len(self._cache)
+            cache_len = len(self._cache) - self._head
             if n >= cache_len:
                 self._cache.extend(islice(self._it, n - cache_len))
 
-        return list(self._cache)[index]
+        # Find the first and last positions the slice selects, and translate
+        # them to positions in the cache list, so only the requested items
+        # are copied.
+        head = self._head
+        start, stop, step = index.indices(len(self._cache) - head)
+        positions = range(start, stop, step)
+        if not positions:
+            return []
+        first = head + positions[0]
+        last = head + positions[-1] + (1 if step > 0 else -1)
+        return self._cache[first:(last if last >= 0 else None):step]
 
     def __getitem__(self, index):
         if isinstance(index, slice):
             return self._get_slice(index)
 
-        cache_len = len(self._cache)
+        cache_len = len(self._cache) - self._head
         if index < 0:
             self._cache.extend(self._it)
+            index += len(self._cache) - self._head
+            if index < 0:
+                raise IndexError('peekable index out of range')
         elif index >= cache_len:
             self._cache.extend(islice(self._it, index + 1 - cache_len))
 
-        return self._cache[index]
+        return self._cache[self._head + index]
 
 
-def _collate(*iterables, **kwargs):
-    """Helper for ``collate()``, called when the user is using the ``reverse``
-    or ``key`` keyword arguments on Python versions below 3.5.
+def _sift_down(heap, pos, before):
+    """Move ``heap[pos]`` down the binary *heap* until neither of its children
+    should come *before* it.
 
     """
-    key = kwargs.pop('key', lambda a: a)
-    reverse = kwargs.pop('reverse', False)
+    end = len(heap)
+    entry = heap[pos]
+    child = 2 * pos + 1
+    while child < end:
+        right = child + 1
+        if (right < end) and before(heap[right], heap[child]):
+            child = right
+        if not before(heap[child], entry):
+            break
+        heap[pos] = heap[child]
+        pos = child
+        child = 2 * pos + 1
+    heap[pos] = entry
+
+
+def _collate(iterables, key, reverse):
+    """Helper for ``collate()``, called when the user is using the ``reverse``
+    or ``key`` keyword arguments on Python versions below 3.5, where
+    :func:`heapq.merge` doesn't accept them. Performs a k-way merge over a
+    binary heap whose entries are ``[key, order, item, iterator]`` lists.
 
-    min_or_max = partial(max if reverse else min, key=itemgetter(0))
-    peekables = [peekable(it) for it in iterables]
-    peekables = [p for p in peekables if p]  # Kill empties.
-    while peekables:
-        _, p = min_or_max((key(p.peek()), p) for p in peekables)
-        yield next(p)
-        peekables = [x for x in peekables if x]
+    Each item's key is computed exactly once, and each output item costs
+    ``O(log k)`` comparisons for ``k`` input iterables. Entries are compared
+    as lists, so ties between equal keys are broken by *order*, which keeps
+    the merge stable, and the items themselves are never compared.
+
+    """
+    # For descending merges the heap is a max-heap, so the order numbers are
+    # negated to keep earlier iterables first among equal keys.
+    before = gt if reverse else lt
+    direction = -1 if reverse else 1
+
+    heap = []
+    for order, it in enumerate(iterables):
+        it = iter(it)
+        for item in it:
+            k = item if (key is None) else key(item)
+            heap.append([k, order * direction, item, it])
+            break
+
+    for pos in reversed(range(len(heap) // 2)):
+        _sift_down(heap, pos, before)
+
+    while len(heap) > 1:
+        entry = heap[0]
+        yield entry[2]
+        for item in entry[3]:
+            entry[0] = item if (key is None) else key(item)
+            entry[2] = item
+            break
+        else:
+            # This iterable is exhausted - replace it with the last entry
+            heap[0] = heap.pop()
+        _sift_down(heap, 0, before)
+
+    # With only one iterable left there's nothing to compare against
+    if heap:
+        _, _, item, it = heap[0]
+        yield item
+        for item in it:
+            yield item
 
 
 def collate(*iterables, **kwargs):
@@ -384,23 +608,29 @@ def collate(*iterables, **kwargs):
     If the elements of the passed-in iterables are out of order, you might get
     unexpected results.
 
-    On Python 2.7, this function delegates to :func:`heapq.merge` if neither
-    of the keyword arguments are specified. On Python 3.5+, this function
-    is an alias for :func:`heapq.merge`.
+    The merge is stable: items with equal keys are emitted in the order of the
+    iterables they came from. The *key* function is called exactly once per
+    item, and each item costs ``O(log k)`` comparisons when merging *k*
+    iterables, with or without the keyword arguments.
 
-    """
-    if not kwargs:
-        return merge(*iterables)
-
-    return _collate(*iterables, **kwargs)
+    This function delegates to :func:`heapq.merge` on Python 3.5+, and on
+    Python 2.7 if neither of the keyword arguments are specified.
 
+    """
+    key = kwargs.pop('key', None)
+    reverse = kwargs.pop('reverse', False)
+    if kwargs:
+        raise TypeError(
+            'collate() got unexpected keyword arguments: {}'.format(
+                ', '.join(sorted(kwargs))
+            )
+        )
 
-# If using Python version 3.5 or greater, heapq.merge() will be faster than
-# collate - use that instead.
-if version_info >= (3, 5, 0):
-    _collate_docstring = collate.__doc__
-    collate = partial(merge)
-    collate.__doc__ = _collate_docstring
+    if version_info >= (3, 5):
+        return merge(*iterables, key=key, reverse=reverse)
+    if (key is None) and (not reverse):
+        return merge(*iterables)
+    return _collate(iterables, key, reverse)
 
 
 def consumer(func):
@@ -479,6 +709,143 @@ def with_iter(context_manager):
             yield item
 
 
+def read_records(source, delimiter=None, length=None, buffer_size=1 << 20):
+    """Yield the records from *source*, which are either separated by
+    *delimiter* or are *length* items long.
+
+    *source* may be a path, which will be opened in binary mode and closed
+    once the records are exhausted, a file object, or an object like a
+    ``bytearray`` or ``mmap`` that supports slicing and a ``find()`` method.
+
+        >>> from io import BytesIO
+        >>> f = BytesIO(b'alpha,beta,,gamma')
+        >>> records = list(read_records(f, delimiter=b','))
+        >>> records == [b'alpha', b'beta', b'', b'gamma']
+        True
+
+    As with :func:`split_at`, the delimiters are not included in the records,
+    and the record after the last delimiter is yielded even if it's empty.
+
+    With *length*, the records are slices of the data, as with
+    :func:`sliced`. The last record may be shorter than the others:
+
+        >>> f = BytesIO(b'0123456789')
+        >>> list(read_records(f, length=4)) == [b'0123', b'4567', b'89']
+        True
+
+    File objects are read in blocks of *buffer_size*, and the records are
+    found with bytes operations rather than by inspecting the data one item
+    at a time. Records that are longer than *buffer_size* are supported, but
+    are slower to assemble. The data from text-mode files can be split too,
+    as long as *delimiter* is a ``str``.
+
+    Buffers are searched directly, so a memory-mapped file is split without
+    reading it all into memory first::
+
+        with open('dump.dat', 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                for record in read_records(m, delimiter=b'\\x1e'):
+                    ...
+
+    Exactly one of *delimiter* and *length* must be given.
+
+    """
+    if (delimiter is None) == (length is None):
+        raise ValueError('exactly one of delimiter and length must be given')
+    if delimiter is not None and not delimiter:
+        raise ValueError('delimiter must not be empty')
+    if length is not None and length < 1:
+        raise ValueError('length must be at least 1')
+    if buffer_size < 1:
+        raise ValueError('buffer_size must be at least 1')
+
+    if isinstance(source, string_types) or hasattr(source, '__fspath__'):
+        return _read_records_path(source, delimiter, length, buffer_size)
+
+    if not hasattr(source, 'find') and hasattr(source, 'read'):
+        return _read_records_file(source, delimiter, length, buffer_size)
+
+    if length is not None:
+        return sliced(source, length)
+
+    return _split_buffer(source, delimiter)
+
+
+def _read_records_path(path, delimiter, length, buffer_size):
+    # Reads are already buffer_size blocks, so Python's buffering isn't needed
+    with open(path, 'rb', buffering=0) as f:
+        for record in _read_records_file(f, delimiter, length, buffer_size):
+            yield record
+
+
+def _split_buffer(data, delimiter):
+    find = data.find
+    skip = len(delimiter)
+    start = 0
+    while True:
+        end = find(delimiter, start)
+        if end == -1:
+            yield data[start:]
+            return
+        yield data[start:end]
+        start = end + skip
+
+
+def _read_records_file(f, delimiter, length, buffer_size):
+    read = f.read
+    chunk = read(buffer_size)
+    join = chunk[:0].join
+
+    # The chunks of a record that spans several reads are collected in
+    # parts, and joined once the record is complete.
+    if length is not None:
+        parts = []
+        size = 0
+        while chunk:
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= length:
+                data = join(parts)
+                end = size - (size % length)
+                for i in range(0, end, length):
+                    yield data[i: i + length]
+                parts = [data[end:]]
+                size -= end
+            chunk = read(buffer_size)
+        if size:
+            yield join(parts)
+        return
+
+    skip = len(delimiter)
+    parts = []
+    tail = chunk[:0]
+    while chunk:
+        data = tail + chunk if tail else chunk
+        find = data.find
+        # A delimiter may straddle the boundary between the old and new data,
+        # but the rest of the old data has already been searched.
+        start = 0
+        end = find(delimiter, max(0, len(tail) - skip + 1))
+        while end != -1:
+            if parts:
+                parts.append(data[start:end])
+                yield join(parts)
+                parts = []
+            else:
+                yield data[start:end]
+            start = end + skip
+            end = find(delimiter, start)
+        # Only the end of the data that could be the start of a delimiter
+        # needs to be searched again.
+        cut = max(start, len(data) - skip + 1)
+        if cut > start:
+            parts.append(data[start:cut])
+        tail = data[cut:]
+        chunk = read(buffer_size)
+    parts.append(tail)
+    yield join(parts)
+
+
 def one(iterable, too_short=None, too_long=None):
     """Return the first item from *iterable*, which is expected to contain only
     that item. Raise an exception if *iterable* is empty or has more than one
@@ -540,10 +907,54 @@ def one(iterable, too_short=None, too_long=None):
     return value
 
 
-def distinct_permutations(iterable):
+def _totally_ordered(items):
+    """Return whether the sorted list *items* is consistently ordered by
+    ``<``. Some items, like sets, can be sorted without error but are only
+    partially ordered.
+
+    """
+    return all(
+        (a == b or a < b) and not (b < a)
+        for a, b in zip(items, islice(items, 1, None))
+    )
+
+
+def _equivalence_classes(pool, key=None):
+    """Group the items in *pool* into lists of items that compare equal (or
+    whose *key* results compare equal), keeping their relative order.
+
+    The lists are sorted by their items (or keys) if possible. If the items
+    can't be totally ordered, they're listed in order of first appearance.
+
+    """
+    keys = pool if (key is None) else list(map(key, pool))
+    try:
+        order = sorted(range(len(pool)), key=keys.__getitem__)
+    except TypeError:
+        order = None
+    if (order is not None) and _totally_ordered([keys[i] for i in order]):
+        return [
+            [pool[i] for i in group]
+            for _, group in groupby(order, key=keys.__getitem__)
+        ]
+
+    class_keys = []
+    classes = []
+    for k, item in zip(keys, pool):
+        for class_key, items in zip(class_keys, classes):
+            if class_key == k:
+                items.append(item)
+                break
+        else:
+            class_keys.append(k)
+            classes.append([item])
+    return classes
+
+
+def distinct_permutations(iterable, r=None, key=None):
     """Yield successive distinct permutations of the elements in *iterable*.
 
-        >>> sorted(distinct_permutations([1, 0, 1]))
+        >>> list(distinct_permutations([1, 0, 1]))
         [(0, 1, 1), (1, 0, 1), (1, 1, 0)]
 
     Equivalent to ``set(permutations(iterable))``, except duplicates are not
@@ -556,29 +967,504 @@ def distinct_permutations(iterable):
     items input, and each `x_i` is the count of a distinct item in the input
     sequence.
 
+    If *r* is given, only the distinct permutations of length *r* are
+    yielded:
+
+        >>> sorted(distinct_permutations([1, 0, 1], r=2))
+        [(0, 1), (1, 0), (1, 1)]
+        >>> list(distinct_permutations(range(3), r=4))
+        []
+
+    If *key* is given, items for which it returns equal values are treated
+    as duplicates of each other. They keep their original relative order
+    in each permutation:
+
+        >>> [''.join(p) for p in distinct_permutations('aAb', key=str.lower)]
+        ['aAb', 'abA', 'baA']
+
+    The permutations are generated in place, one swap-and-reverse step at a
+    time, so each one requires constant work on average beyond building the
+    output tuple. If the items (or keys) are totally ordered, the
+    permutations are emitted in lexicographic order. Otherwise (e.g. for
+    sets, which are only partially ordered) they're compared for equality
+    only, and ordered by first appearance.
+
     """
-    def make_new_permutations(permutations, e):
-        """Internal helper function.
-        The output permutations are built up by adding element *e* to the
-        current *permutations* at every possible position.
-        The key idea is to keep repeated elements (reverse) ordered:
-        if e1 == e2 and e1 is before e2 in the iterable, then all permutations
-        with e1 before e2 are ignored.
+    pool = list(iterable)
+    r = len(pool) if (r is None) else r
+    if r < 0:
+        raise ValueError('r must be non-negative')
 
-        """
-        for permutation in permutations:
-            for j in range(len(permutation)):
-                yield permutation[:j] + [e] + permutation[j:]
-                if permutation[j] == e:
-                    break
-            else:
-                yield permutation + [e]
+    # Totally ordered items can be permuted directly
+    if key is None:
+        try:
+            pool.sort()
+        except TypeError:
+            pass
+        else:
+            if _totally_ordered(pool):
+                return _distinct_permutations(pool, r, tuple)
+
+    # Otherwise each item is represented by the index of its class, so the
+    # permutations are those of a sorted list of integers.
+    classes = _equivalence_classes(pool, key)
+    indexes = []
+    for i, items in enumerate(classes):
+        indexes.extend(repeat(i, len(items)))
+
+    if key is None:
+        get_item = [items[0] for items in classes].__getitem__
+
+        def build(A):
+            return tuple(map(get_item, A))
+    else:
+        # Items with equal keys might not be equal themselves, so they're
+        # taken from their classes in order.
+        def build(A):
+            class_iterators = list(map(iter, classes))
+            return tuple(map(next, map(class_iterators.__getitem__, A)))
+
+    return _distinct_permutations(indexes, r, build)
+
+
+def _distinct_permutations(A, r, build):
+    """Helper for ``distinct_permutations()``. Steps the sorted list *A*
+    through its lexicographic permutations in place, calling *build* on the
+    first *r* items of each to produce the output.
+
+    """
+    size = len(A)
+    if r > size:
+        return
+    if r < size:
+        for x in _distinct_partial_permutations(A, r, build):
+            yield x
+        return
+    if size < 2:
+        yield build(A)
+        return
+
+    left_indexes = range(size - 3, -1, -1)
+    last = size - 1
+    while True:
+        yield build(A)
+
+        # About half the time, only the last two items need to be swapped
+        a, b = A[-2], A[-1]
+        if a < b:
+            A[-2], A[-1] = b, a
+            continue
+
+        # Otherwise, find the rightmost item that's smaller than its
+        # successor...
+        for i in left_indexes:
+            if A[i] < A[i + 1]:
+                break
+        else:
+            return
+
+        # ...swap it with the rightmost larger item after it, and reverse
+        # everything after its position.
+        a = A[i]
+        for j in range(last, i, -1):
+            if a < A[j]:
+                break
+
+        A[i] = A[j]
+        A[j] = a
+        A[i + 1:] = A[:i:-1]
+
+
+def _distinct_partial_permutations(A, r, build):
+    """Like ``_distinct_permutations()``, but for *r* less than the length of
+    *A*.
+
+    """
+    size = len(A)
+    while True:
+        yield build(A[:r])
+
+        # Only the first r positions are output. Reversing the rest puts them
+        # in their last arrangement, so the next step changes the first r.
+        A[r:] = A[:r - 1:-1] if r else A[::-1]
+
+        for i in range(size - 2, -1, -1):
+            if A[i] < A[i + 1]:
+                break
+        else:
+            return
+
+        a = A[i]
+        for j in range(size - 1, i, -1):
+            if a < A[j]:
+                break
+
+        A[i] = A[j]
+        A[j] = a
+        A[i + 1:] = A[:i:-1]
+
+
+def _binomial(n, k):
+    """Return the number of ways to choose *k* items from *n*."""
+    if not (0 <= k <= n):
+        return 0
+
+    c = 1
+    k = min(k, n - k)
+    for i in range(1, k + 1):
+        c = c * (n - k + i) // i
+    return c
+
+
+def _arrangements(counts, r):
+    """Return the number of distinct length-*r* sequences that can be drawn
+    from a multiset whose classes of equal items have the given *counts*.
+
+    """
+    if r == sum(counts):
+        # Every item is used, so this is a multinomial coefficient
+        ways = 1
+        total = 0
+        for c in counts:
+            total += c
+            ways *= _binomial(total, c)
+        return ways
+
+    # ways[j] is the number of length-j sequences using the classes so far.
+    # Adding a class with c items, k of them can go in C(j, k) places.
+    ways = [1] + [0] * r
+    for c in counts:
+        new_ways = ways[:]
+        for j in range(1, r + 1):
+            binomial = 1
+            for k in range(1, min(c, j) + 1):
+                binomial = binomial * (j - k + 1) // k
+                new_ways[j] += ways[j - k] * binomial
+        ways = new_ways
+    return ways[r]
+
+
+def nth_product(index, *args):
+    """Equivalent to ``list(product(*args))[index]``.
+
+    The products of *args* can be ordered lexicographically.
+    :func:`nth_product` computes the product at sort position *index* without
+    computing the previous products.
+
+        >>> nth_product(8, range(2), range(2), range(2), range(2))
+        (1, 0, 0, 0)
+
+    ``IndexError`` will be raised if the given *index* is invalid.
+
+    """
+    pools = list(map(tuple, reversed(args)))
+    c = 1
+    for pool in pools:
+        c *= len(pool)
+
+    if index < 0:
+        index += c
+
+    if (index < 0) or (index >= c):
+        raise IndexError
+
+    result = []
+    for pool in pools:
+        index, i = divmod(index, len(pool))
+        result.append(pool[i])
+
+    return tuple(reversed(result))
+
+
+def product_index(element, *args):
+    """Equivalent to ``list(product(*args)).index(element)``.
+
+    The products of *args* can be ordered lexicographically.
+    :func:`product_index` computes the first index of *element* without
+    computing the previous products.
+
+        >>> product_index([8, 2], range(10), range(5))
+        42
+
+    ``ValueError`` will be raised if the given *element* isn't one of the
+    products of *args*.
+
+    """
+    element = tuple(element)
+    if len(element) != len(args):
+        raise ValueError('element is not a product of args')
+
+    index = 0
+    for x, pool in zip(element, args):
+        pool = tuple(pool)
+        try:
+            i = pool.index(x)
+        except ValueError:
+            raise ValueError('element is not a product of args')
+        index = index * len(pool) + i
+
+    return index
+
+
+def nth_permutation(iterable, r, index):
+    """Equivalent to ``list(permutations(iterable, r))[index]``.
+
+    The subsequences of *iterable* that are of length *r* where order is
+    important can be ordered lexicographically. :func:`nth_permutation`
+    computes the subsequence at sort position *index* directly, without
+    computing the previous subsequences.
+
+        >>> nth_permutation('ghijk', 2, 5)
+        ('h', 'i')
+
+    If *r* is ``None``, it defaults to the length of *iterable*.
+    ``ValueError`` will be raised if *r* is negative or greater than the
+    length of *iterable*. ``IndexError`` will be raised if the given *index*
+    is invalid.
+
+    """
+    pool = list(iterable)
+    n = len(pool)
+    r = n if (r is None) else r
+    if (r < 0) or (r > n):
+        raise ValueError
+
+    c = 1
+    for i in range(n - r + 1, n + 1):
+        c *= i
+
+    if index < 0:
+        index += c
+
+    if (index < 0) or (index >= c):
+        raise IndexError
+
+    # Each choice for the k-th item is followed by c / (n - k) subsequences
+    result = []
+    for k in range(r):
+        c //= n - k
+        i, index = divmod(index, c)
+        result.append(pool.pop(i))
+
+    return tuple(result)
+
+
+def permutation_index(element, iterable):
+    """Equivalent to ``list(permutations(iterable, r)).index(element)``,
+    where *r* is the length of *element*.
+
+    The subsequences of *iterable* that are of length *r* where order is
+    important can be ordered lexicographically. :func:`permutation_index`
+    computes the index of the first *element* directly, without computing
+    the previous subsequences.
+
+        >>> permutation_index([1, 3, 2], range(5))
+        19
+
+    ``ValueError`` will be raised if the given *element* isn't one of the
+    permutations of *iterable*.
+
+    """
+    pool = list(iterable)
+    n = len(pool)
+
+    index = 0
+    for k, x in enumerate(element):
+        try:
+            i = pool.index(x)
+        except ValueError:
+            raise ValueError('element is not a permutation of iterable')
+        index = index * (n - k) + i
+        del pool[i]
+
+    return index
+
+
+def combination_index(element, iterable):
+    """Equivalent to ``list(combinations(iterable, r)).index(element)``,
+    where *r* is the length of *element*.
+
+    The subsequences of *iterable* that are of length *r* can be ordered
+    lexicographically. :func:`combination_index` computes the index of the
+    first *element*, without computing the previous combinations.
+
+        >>> combination_index('adf', 'abcdefg')
+        10
+
+    This is the inverse of :func:`nth_combination`. ``ValueError`` will be
+    raised if the given *element* isn't one of the combinations of
+    *iterable*.
+
+    """
+    pool = tuple(iterable)
+    n = len(pool)
+    element = tuple(element)
+    r = len(element)
+
+    # Find the (earliest) position in the pool of each item
+    positions = []
+    start = 0
+    for x in element:
+        for p in range(start, n):
+            if pool[p] == x:
+                break
+        else:
+            raise ValueError('element is not a combination of iterable')
+        positions.append(p)
+        start = p + 1
+
+    # Count the combinations that come after this one: for each item, those
+    # that agree before it and have a later position for it.
+    after = 0
+    for k, p in enumerate(positions):
+        after += _binomial(n - 1 - p, r - k)
+
+    return _binomial(n, r) - 1 - after
+
+
+def nth_powerset(iterable, index):
+    """Equivalent to ``list(powerset(iterable))[index]``.
+
+    :func:`nth_powerset` computes the subset at position *index* directly,
+    without computing the previous subsets.
+
+        >>> nth_powerset([1, 2, 3], 5)
+        (1, 3)
+
+    ``IndexError`` will be raised if the given *index* is invalid.
+
+    """
+    pool = tuple(iterable)
+    n = len(pool)
+    c = 2 ** n
+
+    if index < 0:
+        index += c
+
+    if (index < 0) or (index >= c):
+        raise IndexError
+
+    # Subsets are ordered by size, so skip over the smaller ones
+    r = 0
+    while index >= _binomial(n, r):
+        index -= _binomial(n, r)
+        r += 1
+
+    return nth_combination(pool, r, index)
+
+
+def powerset_index(element, iterable):
+    """Equivalent to ``list(powerset(iterable)).index(element)``.
+
+    :func:`powerset_index` computes the index of the first *element* without
+    computing the previous subsets.
+
+        >>> powerset_index([1, 3], [1, 2, 3])
+        5
+
+    ``ValueError`` will be raised if the given *element* isn't one of the
+    subsets of *iterable*.
+
+    """
+    pool = tuple(iterable)
+    element = tuple(element)
+    n = len(pool)
+
+    index = combination_index(element, pool)
+    for r in range(len(element)):
+        index += _binomial(n, r)
 
-    permutations = [[]]
-    for e in iterable:
-        permutations = make_new_permutations(permutations, e)
+    return index
 
-    return (tuple(t) for t in permutations)
+
+def nth_distinct_permutation(iterable, r, index):
+    """Equivalent to ``list(distinct_permutations(iterable, r))[index]``.
+
+    :func:`nth_distinct_permutation` computes the permutation at position
+    *index* directly, without computing the previous permutations.
+
+        >>> nth_distinct_permutation('aabc', None, 5)
+        ('a', 'c', 'b', 'a')
+
+    If *r* is ``None``, it defaults to the length of *iterable*.
+    ``ValueError`` will be raised if *r* is negative or greater than the
+    length of *iterable*. ``IndexError`` will be raised if the given *index*
+    is invalid.
+
+    """
+    classes = _equivalence_classes(list(iterable))
+    counts = list(map(len, classes))
+    n = sum(counts)
+    r = n if (r is None) else r
+    if (r < 0) or (r > n):
+        raise ValueError
+
+    c = _arrangements(counts, r)
+    if index < 0:
+        index += c
+
+    if (index < 0) or (index >= c):
+        raise IndexError
+
+    # For each position, skip past the permutations that start with an
+    # earlier class.
+    result = []
+    for k in range(r):
+        for i, items in enumerate(classes):
+            if not counts[i]:
+                continue
+            counts[i] -= 1
+            c = _arrangements(counts, r - k - 1)
+            if index < c:
+                result.append(items[len(items) - counts[i] - 1])
+                break
+            index -= c
+            counts[i] += 1
+
+    return tuple(result)
+
+
+def distinct_permutation_index(element, iterable):
+    """Equivalent to
+    ``list(distinct_permutations(iterable, r)).index(tuple(element))``,
+    where *r* is the length of *element*.
+
+    :func:`distinct_permutation_index` computes the index of *element*
+    directly, without computing the previous permutations.
+
+        >>> distinct_permutation_index('acba', 'aabc')
+        5
+
+    ``ValueError`` will be raised if the given *element* isn't one of the
+    distinct permutations of *iterable*.
+
+    """
+    classes = _equivalence_classes(list(iterable))
+    counts = list(map(len, classes))
+    element = tuple(element)
+    r = len(element)
+
+    index = 0
+    for k, x in enumerate(element):
+        for i, items in enumerate(classes):
+            if items[0] == x:
+                break
+        else:
+            i = None
+        if (i is None) or (not counts[i]):
+            raise ValueError(
+                'element is not a distinct permutation of iterable'
+            )
+
+        # Count the permutations that start with an earlier class here
+        for j in range(i):
+            if counts[j]:
+                counts[j] -= 1
+                index += _arrangements(counts, r - k - 1)
+                counts[j] += 1
+        counts[i] -= 1
+
+    return index
 
 
 def intersperse(e, iterable, n=1):
@@ -607,6 +1493,86 @@ def intersperse(e, iterable, n=1):
         return flatten(islice(interleave(filler, chunks), 1, None))
 
 
+class _UnhashableCount(object):
+    """The number of times the unhashable *key* is in the window of
+    :func:`unique_in_window`.
+
+    """
+    __slots__ = ('key', 'count')
+
+    def __init__(self, key):
+        self.key = key
+        self.count = 0
+
+
+def unique_in_window(iterable, n, key=None):
+    """Yield the items from *iterable* that haven't been seen recently.
+    *n* is the size of the lookback window.
+
+        >>> iterable = [0, 1, 0, 2, 3, 0]
+        >>> n = 2
+        >>> list(unique_in_window(iterable, n))
+        [0, 1, 2, 3, 0]
+
+    The *key* function, if provided, will be used to determine uniqueness:
+
+        >>> list(unique_in_window('abAcda', 2, key=lambda x: x.lower()))
+        ['a', 'b', 'c', 'd', 'a']
+
+    Unlike :func:`unique_everseen`, which remembers every distinct item,
+    only the keys of the last *n* items are stored, so this is suitable for
+    removing nearby duplicates (like retried messages) from an infinite
+    iterable. Unhashable keys are converted as they are for
+    :func:`unique_everseen`; other unhashable keys are compared one by one
+    against the ones in the window, which is slower.
+
+    """
+    if n <= 0:
+        raise ValueError('n must be greater than 0')
+
+    window = deque()
+    counts = {}
+    # Keys that can't be converted are found by comparing against each one.
+    # Their _UnhashableCount entries go in the window in place of the keys.
+    unhashable = []
+    for item in iterable:
+        k = item if (key is None) else key(item)
+        try:
+            count = counts.get(k, 0)
+        except TypeError:
+            try:
+                k = _freeze(k)
+            except TypeError:
+                for entry in unhashable:
+                    if entry.key == k:
+                        break
+                else:
+                    entry = _UnhashableCount(k)
+                    unhashable.append(entry)
+                k = entry
+                count = entry.count
+            else:
+                count = counts.get(k, 0)
+        if not count:
+            yield item
+
+        window.append(k)
+        if type(k) is _UnhashableCount:
+            k.count += 1
+        else:
+            counts[k] = count + 1
+        if len(window) > n:
+            old = window.popleft()
+            if type(old) is _UnhashableCount:
+                old.count -= 1
+                if not old.count:
+                    unhashable.remove(old)
+            else:
+                counts[old] -= 1
+                if not counts[old]:
+                    del counts[old]
+
+
 def unique_to_each(*iterables):
     """Return the elements from each of the input iterables that aren't in the
     other input iterables.
@@ -692,7 +1658,136 @@ def windowed(seq, n, fillvalue=None, step=1):
         yield tuple(window)
 
 
-def substrings(iterable):
+class _WindowView(Sequence):
+    """A read-only view of *length* items of the list *target*, starting at
+    position *start*. Used by :func:`windowed_view`.
+
+    """
+    def __init__(self, target, start, length):
+        self._target = target
+        self._start = start
+        self._len = length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # Slice the target between the first and last positions the
+            # slice selects, since the bounds from indices() can lie outside
+            # the window (e.g. -1 for a negative step).
+            start, stop, step = index.indices(self._len)
+            positions = range(start, stop, step)
+            if not positions:
+                return []
+            start = self._start + positions[0]
+            stop = self._start + positions[-1] + (1 if step > 0 else -1)
+            return self._target[start:(stop if stop >= 0 else None):step]
+
+        if index < 0:
+            index += self._len
+        if not (0 <= index < self._len):
+            raise IndexError('window index out of range')
+        return self._target[self._start + index]
+
+    def __len__(self):
+        return self._len
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self[:])
+
+
+def windowed_view(seq, n, fillvalue=None, step=1, batch=None):
+    """Like :func:`windowed`, but yield read-only, sequence-like views of the
+    windows instead of creating a new tuple for each one:
+
+        >>> all_windows = windowed_view([1, 2, 3, 4, 5], 3)
+        >>> [tuple(w) for w in all_windows]
+        [(1, 2, 3), (2, 3, 4), (3, 4, 5)]
+
+    The views support indexing, slicing, and length queries. *fillvalue* and
+    *step* work as they do for :func:`windowed`:
+
+        >>> all_windows = windowed_view([1, 2, 3, 4, 5, 6], 3, '!', step=2)
+        >>> [w[-1] for w in all_windows]
+        [3, 5, '!']
+
+    Set *batch* to receive lists of up to that many windows at a time:
+
+        >>> all_windows = windowed_view(range(6), 2, batch=2)
+        >>> [[tuple(w) for w in b] for b in all_windows]
+        [[(0, 1), (1, 2)], [(2, 3), (3, 4)], [(4, 5)]]
+
+    The items are kept in a "doubled" ring buffer, which stores each item
+    once more past its end so that every window occupies a contiguous
+    stretch of it. Producing a window therefore doesn't require copying its
+    items, which makes wide windows much cheaper than with :func:`windowed`.
+
+    The buffer is reused as the iterable advances, so a view is only valid
+    until the next window (or batch of windows) is produced. Copy any views
+    that need to be kept around, e.g. with ``tuple(w)``.
+
+    """
+    if n < 0:
+        raise ValueError('n must be >= 0')
+    if step < 1:
+        raise ValueError('step must be >= 1')
+    if (batch is not None) and (batch < 1):
+        raise ValueError('batch must be >= 1')
+
+    if n == 0:
+        window = _WindowView((), 0, 0)
+        yield window if (batch is None) else [window]
+        return
+
+    # Each window in a batch must survive until the batch's last window is
+    # complete, which takes another (batch - 1) * step items.
+    capacity = n + ((batch or 1) - 1) * step
+    buf = [fillvalue] * (capacity + n)
+
+    windows = []
+    count = 0  # Number of items written to the buffer
+    pos = 0  # Position in the buffer for the next item
+    next_at = n  # Item count at which the next window is complete
+
+    it = iter(seq)
+    padded = False
+    while True:
+        for item in it:
+            buf[pos] = item
+            if pos < n:
+                buf[pos + capacity] = item
+            count += 1
+            pos += 1
+            if pos == capacity:
+                pos = 0
+
+            if count == next_at:
+                next_at += step
+                window = _WindowView(buf, (pos - n) % capacity, n)
+                if batch is None:
+                    yield window
+                else:
+                    windows.append(window)
+                    if len(windows) == batch:
+                        yield windows
+                        windows = []
+
+        if padded:
+            break
+        padded = True
+
+        # Pad a partially filled window with the fill value, the same way
+        # windowed() does.
+        remaining = next_at - count
+        if (count < n) or (remaining < min(step, n)):
+            it = repeat(fillvalue, remaining)
+        else:
+            break
+
+    if windows:
+        yield windows
+
+
+def substrings(iterable, min_len=1, max_len=None, distinct=False,
+               indexes=False):
     """Yield all of the substrings of *iterable*.
 
         >>> [''.join(s) for s in substrings('more')]
@@ -703,19 +1798,245 @@ def substrings(iterable):
         >>> list(substrings([0, 1, 2]))
         [(0,), (1,), (2,), (0, 1), (1, 2), (0, 1, 2)]
 
+    Substrings are yielded in order of length, and then in order of position.
+    *min_len* and *max_len* restrict their lengths:
+
+        >>> [''.join(s) for s in substrings('more', min_len=2, max_len=3)]
+        ['mo', 'or', 're', 'mor', 'ore']
+
+    If *distinct* is ``True``, each distinct substring is only yielded at
+    its first occurrence. The items must be hashable, and repeats are found
+    with a suffix array rather than by storing the substrings that have
+    been seen:
+
+        >>> [''.join(s) for s in substrings('abab', distinct=True)]
+        ['a', 'b', 'ab', 'ba', 'aba', 'bab', 'abab']
+
+    If *indexes* is ``True``, ``(start, stop)`` pairs are yielded instead of
+    copies of the substrings. Use them to slice the input (or a
+    ``memoryview`` of it) only when needed:
+
+        >>> list(substrings('aaa', distinct=True, indexes=True))
+        [(0, 1), (0, 2), (0, 3)]
+
     """
-    # The length-1 substrings
-    seq = []
-    for item in iter(iterable):
-        seq.append(item)
-        yield (item,)
-    seq = tuple(seq)
+    if min_len < 1:
+        raise ValueError('min_len must be at least 1')
+
+    if min_len == 1 and not (distinct or indexes):
+        # The length-1 substrings
+        seq = []
+        for item in iter(iterable):
+            seq.append(item)
+            if max_len is None or max_len >= 1:
+                yield (item,)
+        seq = tuple(seq)
+        min_len = 2
+    else:
+        seq = tuple(iterable)
     item_count = len(seq)
+    if max_len is None or max_len > item_count:
+        max_len = item_count
+
+    # The longest prefix each position shares with an earlier position.
+    # Substrings that aren't longer than that have been seen before.
+    if distinct:
+        repeats = _earlier_repeats(seq)
+    else:
+        repeats = [0] * item_count
 
     # And the rest
-    for n in range(2, item_count + 1):
+    for n in range(min_len, max_len + 1):
         for i in range(item_count - n + 1):
-            yield seq[i:i + n]
+            if n > repeats[i]:
+                yield (i, i + n) if indexes else seq[i:i + n]
+
+
+def _suffix_array(seq):
+    """Return the suffix array of *seq*, computed by prefix doubling."""
+    n = len(seq)
+    ids = {}
+    rank = [ids.setdefault(item, len(ids)) for item in seq]
+    suffixes = list(range(n))
+    k = 1
+    while True:
+        key = lambda i: (rank[i], rank[i + k] if i + k < n else -1)
+        suffixes.sort(key=key)
+        new_rank = [0] * n
+        for prev, i in zip(suffixes, islice(suffixes, 1, None)):
+            new_rank[i] = new_rank[prev] + (key(prev) != key(i))
+        rank = new_rank
+        if (not n) or rank[suffixes[-1]] == n - 1:
+            return suffixes
+        k *= 2
+
+
+def _earlier_repeats(seq):
+    """For each position in *seq*, return the length of the longest common
+    prefix of the suffix starting there and the suffixes starting earlier.
+
+    """
+    n = len(seq)
+    suffixes = _suffix_array(seq)
+
+    # Kasai's algorithm. lcp[r] is the longest common prefix of the suffixes
+    # with ranks r - 1 and r.
+    rank = [0] * n
+    for r, i in enumerate(suffixes):
+        rank[i] = r
+    lcp = [0] * (n + 1)
+    h = 0
+    for i in range(n):
+        r = rank[i]
+        if r:
+            j = suffixes[r - 1]
+            while i + h < n and j + h < n and seq[i + h] == seq[j + h]:
+                h += 1
+            lcp[r] = h
+            if h:
+                h -= 1
+        else:
+            h = 0
+
+    # The longest prefix shared with an earlier position is shared with the
+    # nearest earlier position in suffix order, on one side or the other.
+    # Find them with a stack of (position, minimum LCP to the entry above).
+    ret = [0] * n
+    for ranks, gap in (
+        (range(n), lambda r: lcp[r]),
+        (range(n - 1, -1, -1), lambda r: lcp[r + 1]),
+    ):
+        stack = []
+        for r in ranks:
+            i = suffixes[r]
+            if stack:
+                stack[-1][1] = min(stack[-1][1], gap(r))
+            while stack and stack[-1][0] > i:
+                m = stack.pop()[1]
+                if stack:
+                    stack[-1][1] = min(stack[-1][1], m)
+            if stack:
+                ret[i] = max(ret[i], stack[-1][1])
+            stack.append([i, n])
+
+    return ret
+
+
+# The number of items ngram_counts() reads from its input at a time
+_NGRAM_BLOCK_SIZE = 65536
+
+
+def ngram_counts(iterable, n_range, min_count=1, width=None, depth=4):
+    """Count the n-grams (runs of *n* consecutive items) in *iterable* for
+    each length *n* in *n_range*, which may be an integer or an iterable of
+    integers:
+
+        >>> counts = ngram_counts('abracadabra', [1, 2])
+        >>> counts[('a',)], counts[('a', 'b')], counts[('b', 'r')]
+        (5, 2, 2)
+
+    The result is a :class:`collections.Counter` of tuples, like the one
+    produced by ``Counter(windowed(iterable, n))``, but it's computed in a
+    single pass for all of the lengths. *iterable* is read in blocks, and
+    the n-grams in each block are built by :func:`zip` and counted by
+    :meth:`collections.Counter.update`, so no Python code runs for each
+    position. Unlike :func:`windowed`, no padded n-gram is counted when
+    *iterable* has fewer than *n* items. The items must be hashable.
+
+    N-grams that occur fewer than *min_count* times are left out:
+
+        >>> sorted(ngram_counts('abracadabra', 3, min_count=2).items())
+        [(('a', 'b', 'r'), 2), (('b', 'r', 'a'), 2)]
+
+    If *width* is given, the n-grams are counted approximately with a
+    :class:`CountMinSketch` with *width* counters in each of *depth* rows,
+    which is returned instead. It uses a fixed amount of memory however many
+    distinct items and n-grams there are. *min_count* isn't supported in
+    this mode.
+
+        >>> sketch = ngram_counts('abracadabra', [1, 2], width=1000)
+        >>> sketch[('a',)], sketch[('a', 'b')]
+        (5, 2)
+
+    """
+    if isinstance(n_range, integer_types):
+        n_range = [n_range]
+    lengths = sorted(set(n_range))
+    if not lengths or lengths[0] < 1:
+        raise ValueError('n_range must contain lengths of at least 1')
+    if width is not None:
+        if min_count != 1:
+            raise ValueError('min_count is not supported with width')
+        return _ngram_sketch(iterable, lengths, width, depth)
+
+    # Each block is prefixed with the last few items of the one before it,
+    # so that n-grams spanning the two are counted. N-grams of different
+    # lengths are different tuples, so they can share a Counter.
+    longest = lengths[-1]
+    ret = Counter()
+    tail = []
+    it = iter(iterable)
+    while True:
+        block = take(_NGRAM_BLOCK_SIZE, it)
+        if not block:
+            break
+        block[:0] = tail
+        skip = len(tail)
+        for n in lengths:
+            start = max(skip - n + 1, 0)
+            columns = [islice(block, i, None) for i in range(start, start + n)]
+            ret.update(zip(*columns))
+        tail = block[max(len(block) - longest + 1, 0):]
+
+    if min_count > 1:
+        ret = Counter(
+            {ngram: freq for ngram, freq in ret.items() if freq >= min_count}
+        )
+    return ret
+
+
+# Rolling hashes for n-grams are polynomials in _NGRAM_BASE, modulo a prime
+_NGRAM_PRIME = (1 << 61) - 1
+_NGRAM_BASE = 0x5bd1e995
+
+
+def _ngram_item_hash(item):
+    return (hash(item) & 0xffffffffffffffff) % _NGRAM_PRIME
+
+
+def _ngram_hash(ngram):
+    """Return the rolling hash of the tuple *ngram* that
+    :func:`_ngram_sketch` computes incrementally.
+
+    """
+    h = 0
+    for item in ngram:
+        h = (h * _NGRAM_BASE + _ngram_item_hash(item)) % _NGRAM_PRIME
+    return h ^ (len(ngram) * 0x9e3779b97f4a7c15)
+
+
+def _ngram_sketch(iterable, lengths, width, depth):
+    sketch = CountMinSketch(width, depth, key=_ngram_hash)
+    add_hash = sketch._add_hash
+    longest = lengths[-1]
+    powers = [
+        (n, pow(_NGRAM_BASE, n, _NGRAM_PRIME), n * 0x9e3779b97f4a7c15)
+        for n in lengths
+    ]
+
+    # The hash of the items in [i, j) is prefix[j] - prefix[i] * base ** (j -
+    # i), where prefix[j] is the hash of the first j items.
+    prefixes = deque([0], longest + 1)
+    prefix = 0
+    for pos, item in enumerate(iterable, 1):
+        prefix = (prefix * _NGRAM_BASE + _ngram_item_hash(item)) % _NGRAM_PRIME
+        prefixes.appendleft(prefix)
+        for n, power, salt in powers:
+            if pos < n:
+                break
+            h = (prefix - prefixes[n] * power) % _NGRAM_PRIME
+            add_hash(h ^ salt)
+    return sketch
 
 
 class bucket(object):
@@ -750,25 +2071,201 @@ class bucket(object):
         >>> list(s[2])
         []
 
+    To limit the storage used, set *max_cached* to the most items that may
+    be cached in total, and *max_cached_per_key* to the most that may be
+    cached for any one key. *on_overflow* determines what happens to an item
+    that doesn't fit:
+
+    * ``'raise'`` (the default) raises ``RuntimeError``. The item is put
+      back, so it will be read again the next time the source is advanced.
+    * ``'drop_oldest'`` discards the oldest cached item with the same key
+      (if the per-key limit was reached) or the oldest cached item overall,
+      to make room.
+    * ``'spill'`` pickles the item to a temporary file, where it's kept until
+      it's needed. Items are read back in order. The file is emptied
+      whenever all of the spilled items have been read back, and is removed
+      when the ``bucket`` is garbage collected.
+
+        >>> s = bucket(range(10), key=lambda x: x % 2, max_cached_per_key=2,
+        ...            on_overflow='drop_oldest')
+        >>> list(s[0])
+        [0, 2, 4, 6, 8]
+        >>> list(s[1])
+        [7, 9]
+
+    :meth:`cache_info` reports how many items are cached.
+
     """
-    def __init__(self, iterable, key, validator=None):
-        self._it = iter(iterable)
+    def __init__(
+        self,
+        iterable,
+        key,
+        validator=None,
+        max_cached=None,
+        max_cached_per_key=None,
+        on_overflow='raise',
+    ):
+        self._source = self._it = iter(iterable)
         self._key = key
         self._cache = defaultdict(deque)
         self._validator = validator or (lambda x: True)
 
+        for limit in (max_cached, max_cached_per_key):
+            if (limit is not None) and (limit < 0):
+                raise ValueError('cache limits must be at least 0')
+        if on_overflow not in ('raise', 'drop_oldest', 'spill'):
+            raise ValueError(
+                "on_overflow must be 'raise', 'drop_oldest', or 'spill'"
+            )
+        self._max_cached = max_cached
+        self._max_cached_per_key = max_cached_per_key
+        self._on_overflow = on_overflow
+
+        self._cached = 0
+        self._peak_cached = 0
+        self._dropped = 0
+
+        # In 'drop_oldest' mode with a global limit, self._order has a
+        # (key, n) pair for each cached item, oldest first. n counts the
+        # items added for that key, so the item is still cached if n is at
+        # least the number that have been removed for the key.
+        self._order = None
+        if (on_overflow == 'drop_oldest') and (max_cached is not None):
+            self._order = deque()
+            self._added = defaultdict(int)
+            self._removed = defaultdict(int)
+
+        # In 'spill' mode, items that don't fit are appended to a spill file
+        # and their indexes are kept per-key. Once a key has spilled items,
+        # its later items are spilled too, so they stay in order.
+        # self._unread counts the spilled items that haven't been read back.
+        self._spill = None
+        self._spilled = defaultdict(deque)
+        self._unread = 0
+
     def __contains__(self, value):
         if not self._validator(value):
             return False
 
-        try:
-            item = next(self[value])
-        except StopIteration:
-            return False
-        else:
-            self._cache[value].appendleft(item)
+        try:
+            item = next(self[value])
+        except StopIteration:
+            return False
+        else:
+            self._unpop(value, item)
+
+        return True
+
+    def _full(self, value):
+        return (
+            (
+                (self._max_cached_per_key is not None) and
+                (len(self._cache[value]) >= self._max_cached_per_key)
+            ) or
+            (
+                (self._max_cached is not None) and
+                (self._cached >= self._max_cached)
+            )
+        )
+
+    def _push(self, value, item):
+        """Cache *item*, which has the key *value*."""
+        if self._spilled[value]:
+            self._spill_item(value, item)
+            return
+
+        if self._full(value):
+            if self._on_overflow == 'raise':
+                # Put the item back in front of the source. Any item put back
+                # before has been read again by now, so this doesn't nest.
+                self._it = chain((item,), self._source)
+                raise RuntimeError(
+                    'bucket cache is full: cannot cache an item for '
+                    'key {!r}'.format(value)
+                )
+            elif self._on_overflow == 'spill':
+                self._spill_item(value, item)
+                return
+
+            self._drop(value)
+            if self._full(value):
+                # One of the limits is 0
+                self._dropped += 1
+                return
+
+        self._cache[value].append(item)
+        self._cached += 1
+        self._peak_cached = max(self._peak_cached, self._cached)
+        if self._order is not None:
+            self._order.append((value, self._added[value]))
+            self._added[value] += 1
+            # Forget about items that have been removed
+            if len(self._order) > 2 * (self._cached + 1):
+                self._order = deque(
+                    (k, n) for k, n in self._order if n >= self._removed[k]
+                )
+
+    def _drop(self, value):
+        """Discard the oldest cached item for *value* if it's at its limit,
+        or else the oldest cached item overall.
+
+        """
+        cache = self._cache[value]
+        if (
+            (self._max_cached_per_key is not None) and
+            (len(cache) >= self._max_cached_per_key)
+        ):
+            if cache:
+                self._pop(value)
+                self._dropped += 1
+            return
+
+        order = self._order
+        while order:
+            k, n = order.popleft()
+            if n >= self._removed[k]:
+                self._pop(k)
+                self._dropped += 1
+                return
+
+    def _spill_item(self, value, item):
+        if self._spill is None:
+            self._spill = _SpillFile()
+        self._spilled[value].append(len(self._spill))
+        self._spill.append(item)
+        self._unread += 1
+
+    def _pop(self, value):
+        """Remove and return the oldest cached item for *value*. Raise
+        ``IndexError`` if there isn't one.
+
+        """
+        cache = self._cache[value]
+        if cache:
+            item = cache.popleft()
+            self._cached -= 1
+            if self._order is not None:
+                self._removed[value] += 1
+            return item
+
+        item = self._spill[self._spilled[value].popleft()]
+        self._unread -= 1
+        if not self._unread:
+            # Reclaim the space used by the items that have been read back
+            self._spill.clear()
+        return item
 
-        return True
+    def _unpop(self, value, item):
+        """Return *item* to the front of the cache for *value*, regardless of
+        the limits.
+
+        """
+        self._cache[value].appendleft(item)
+        self._cached += 1
+        self._peak_cached = max(self._peak_cached, self._cached)
+        if self._order is not None:
+            self._removed[value] -= 1
+            self._order.append((value, self._removed[value]))
 
     def _get_values(self, value):
         """
@@ -779,8 +2276,8 @@ class bucket(object):
         while True:
             # If we've cached some items that match the target value, emit
             # the first one and evict it from the cache.
-            if self._cache[value]:
-                yield self._cache[value].popleft()
+            if self._cache[value] or self._spilled[value]:
+                yield self._pop(value)
             # Otherwise we need to advance the parent iterator to search for
             # a matching item, caching the rest.
             else:
@@ -794,7 +2291,7 @@ class bucket(object):
                         yield item
                         break
                     elif self._validator(item_value):
-                        self._cache[item_value].append(item)
+                        self._push(item_value, item)
 
     def __getitem__(self, value):
         if not self._validator(value):
@@ -802,6 +2299,93 @@ class bucket(object):
 
         return self._get_values(value)
 
+    def cache_info(self):
+        """Return a dictionary with statistics about the cache:
+
+        * ``'cached'``: the number of items held in memory.
+        * ``'peak_cached'``: the largest number of items that have been held
+          in memory at once.
+        * ``'spilled'``: the number of items waiting in the spill file.
+        * ``'dropped'``: the number of items that have been discarded.
+        * ``'keys'``: a dictionary mapping each key that has waiting items
+          to the number of them (in memory or spilled).
+
+        """
+        keys = {}
+        for mapping in (self._cache, self._spilled):
+            for value, items in mapping.items():
+                if items:
+                    keys[value] = keys.get(value, 0) + len(items)
+
+        return {
+            'cached': self._cached,
+            'peak_cached': self._peak_cached,
+            'spilled': sum(len(x) for x in self._spilled.values()),
+            'dropped': self._dropped,
+            'keys': keys,
+        }
+
+
+def fanout(iterable, key, sinks, default=None):
+    """Make a single pass over *iterable*, sending each item to the sink
+    in the *sinks* mapping for its *key*.
+
+    Unlike :class:`bucket`, which caches items until a child iterable asks
+    for them, this pushes each item to its destination as soon as it's
+    read, so nothing is buffered.
+
+    A sink is either a function, which is called with each item, or an
+    object with a ``send()`` method, such as a generator decorated with
+    :func:`consumer`:
+
+        >>> evens, odds = [], []
+        >>> @consumer
+        ... def printer():
+        ...     while True:
+        ...         print('Got {}'.format((yield)))
+        >>> sinks = {0: evens.append, 1: printer()}
+        >>> fanout([1, 2, 3, 4], lambda x: x % 2, sinks)
+        Got 1
+        Got 3
+        >>> evens
+        [2, 4]
+
+    Items whose keys aren't in *sinks* are sent to the *default* sink if
+    one is given, and otherwise discarded:
+
+        >>> short = []
+        >>> fanout(['abc', 'de', 'f'], len, {3: print}, default=short.append)
+        abc
+        >>> short
+        ['de', 'f']
+
+    Since *sinks* is indexed rather than searched, a
+    ``collections.defaultdict`` can be used to create sinks for new keys as
+    they're seen.
+
+    """
+    default_func = None
+    if default is not None:
+        default_func = getattr(default, 'send', default)
+
+    # Look up each key's sink only once
+    funcs = {}
+    for item in iterable:
+        k = key(item)
+        try:
+            func = funcs[k]
+        except KeyError:
+            try:
+                sink = sinks[k]
+            except KeyError:
+                func = default_func
+            else:
+                func = getattr(sink, 'send', sink)
+            funcs[k] = func
+
+        if func is not None:
+            func(item)
+
 
 def spy(iterable, n=1):
     """Return a 2-tuple with a list containing the first *n* elements of
@@ -900,27 +2484,55 @@ def collapse(iterable, base_type=None, levels=None):
     ['a', ['b'], 'c', ['d']]
 
     """
-    def walk(node, level):
-        if (
-            ((levels is not None) and (level > levels)) or
-            isinstance(node, string_types) or
-            ((base_type is not None) and isinstance(node, base_type))
-        ):
-            yield node
-            return
+    # Whether a type's instances are always leaves is decided once per type.
+    # Types that define __iter__ or __getitem__ may still fail to iterate
+    # (e.g. zero-dimensional NumPy arrays), so iter() is always tried on
+    # those.
+    leaf_types = {}
+
+    def is_leaf_type(t):
+        if issubclass(t, string_types):
+            return True
+        if (base_type is not None) and issubclass(t, base_type):
+            return True
+        return not (hasattr(t, '__iter__') or hasattr(t, '__getitem__'))
+
+    # The nodes are walked with a stack of iterators rather than with nested
+    # generators, so each leaf is yielded directly, at any depth. A node's
+    # level is the size of the stack when it's reached.
+    stack = [iter((iterable,))]
+    while stack:
+        for node in stack[-1]:
+            level = len(stack) - 1
+            if (levels is not None) and (level > levels):
+                yield node
+                continue
 
-        try:
-            tree = iter(node)
-        except TypeError:
-            yield node
-            return
-        else:
-            for child in tree:
-                for x in walk(child, level + 1):
-                    yield x
+            node_type = type(node)
+            try:
+                leaf = leaf_types[node_type]
+            except KeyError:
+                leaf = leaf_types[node_type] = is_leaf_type(node_type)
+            if leaf:
+                yield node
+                continue
+
+            try:
+                tree = iter(node)
+            except TypeError:
+                yield node
+                continue
+
+            # The children of a node at the last level are all leaves
+            if level == levels:
+                for child in tree:
+                    yield child
+                continue
 
-    for x in walk(iterable, 0):
-        yield x
+            stack.append(tree)
+            break
+        else:
+            stack.pop()
 
 
 def side_effect(func, iterable, chunk_size=None, before=None, after=None):
@@ -985,7 +2597,7 @@ def side_effect(func, iterable, chunk_size=None, before=None, after=None):
             after()
 
 
-def sliced(seq, n):
+def sliced(seq, n, step=None, buffer=False):
     """Yield slices of length *n* from the sequence *seq*.
 
         >>> list(sliced((1, 2, 3, 4, 5, 6), 3))
@@ -997,11 +2609,58 @@ def sliced(seq, n):
         >>> list(sliced((1, 2, 3, 4, 5, 6, 7, 8), 3))
         [(1, 2, 3), (4, 5, 6), (7, 8)]
 
+    By default each slice starts where the previous one ended. Set *step* to
+    start each slice *step* items after the previous one instead, so that
+    slices overlap (or have gaps between them). Slicing stops once a slice
+    reaches the end of *seq*:
+
+        >>> list(sliced((1, 2, 3, 4, 5, 6), 3, step=2))
+        [(1, 2, 3), (3, 4, 5), (5, 6)]
+
+    The number of slices is computed from ``len(seq)``, so slices that are
+    "falsy" don't end the iteration early.
+
+    Set *buffer* to ``True`` to slice a :class:`memoryview` of *seq* rather
+    than *seq* itself. This works for objects that support the buffer
+    protocol, like :class:`bytes`, :class:`bytearray`, :class:`array.array`,
+    and :class:`mmap.mmap`, and avoids copying the data for each slice:
+
+        >>> slices = list(sliced(b'abcdefg', 3, buffer=True))
+        >>> slices[0]  # doctest: +ELLIPSIS
+        <memory at ...>
+        >>> [s.tobytes() for s in slices] == [b'abc', b'def', b'g']
+        True
+
+    A memory-mapped file can't be closed while there are views of it, so
+    release the slices (or let them be garbage collected) first. On Python
+    2.7, :class:`array.array` and :class:`mmap.mmap` objects don't support
+    :class:`memoryview`, so only ``bytes`` and ``bytearray`` objects can be
+    used with *buffer*.
+
     This function will only work for iterables that support slicing.
     For non-sliceable iterables, see :func:`chunked`.
 
     """
-    return takewhile(bool, (seq[i: i + n] for i in count(0, n)))
+    if n < 1:
+        raise ValueError('n must be at least 1')
+    if step is None:
+        step = n
+    elif step < 1:
+        raise ValueError('step must be at least 1')
+
+    if buffer:
+        seq = memoryview(seq)
+
+    try:
+        size = len(seq)
+    except TypeError:
+        # Without a length, stop at the first empty slice
+        return takewhile(bool, (seq[i: i + n] for i in count(0, step)))
+
+    # Slices start at each multiple of step that's within seq, except for
+    # those after a slice that reached the end.
+    num_slices = min(-(-size // step), 1 + max(0, -(-(size - n) // step)))
+    return (seq[i: i + n] for i in range(0, num_slices * step, step))
 
 
 def split_at(iterable, pred):
@@ -1144,7 +2803,7 @@ def padded(iterable, fillvalue=None, n=None, next_multiple=False):
             yield fillvalue
 
 
-def distribute(n, iterable):
+def distribute(n, iterable, thread_safe=False):
     """Distribute the items from *iterable* among *n* smaller iterables.
 
         >>> group_1, group_2 = distribute(2, [1, 2, 3, 4, 5, 6])
@@ -1171,12 +2830,71 @@ def distribute(n, iterable):
     storage. If you need the order items in the smaller iterables to match the
     original iterable, see :func:`divide`.
 
+    :func:`itertools.tee` isn't thread-safe. If *thread_safe* is ``True``,
+    the items are instead pulled from *iterable* once, under a lock, and
+    appended to a queue for the child they belong to, so each child may be
+    consumed in a different thread:
+
+        >>> from threading import Thread
+        >>> results = [[], []]
+        >>> children = distribute(2, range(10), thread_safe=True)
+        >>> threads = [
+        ...     Thread(target=results[i].extend, args=(children[i],))
+        ...     for i in range(2)
+        ... ]
+        >>> for t in threads:
+        ...     t.start()
+        >>> for t in threads:
+        ...     t.join()
+        >>> results
+        [[0, 2, 4, 6, 8], [1, 3, 5, 7, 9]]
+
     """
     if n < 1:
         raise ValueError('n must be at least 1')
 
-    children = tee(iterable, n)
-    return [islice(it, index, None, n) for index, it in enumerate(children)]
+    if not thread_safe:
+        children = tee(iterable, n)
+        return [
+            islice(it, index, None, n) for index, it in enumerate(children)
+        ]
+
+    it = iter(iterable)
+    queues = [deque() for _ in range(n)]
+    lock = Lock()
+    # The index of the queue for the next item, or None once it's exhausted
+    state = [0]
+
+    def fill(queue):
+        # Read items until one belongs in queue, and return whether it has
+        # any items left.
+        while not queue:
+            index = state[0]
+            if index is None:
+                return False
+            try:
+                item = next(it)
+            except StopIteration:
+                state[0] = None
+                return False
+            queues[index].append(item)
+            state[0] = (index + 1) % n
+        return True
+
+    def child(queue):
+        while True:
+            # Only this child removes items from its queue, but the other
+            # children may add to it from other threads.
+            if queue:
+                item = queue.popleft()
+                yield item
+                continue
+
+            with lock:
+                if not fill(queue):
+                    return
+
+    return [child(queue) for queue in queues]
 
 
 def stagger(iterable, offsets=(-1, 0, 1), longest=False, fillvalue=None):
@@ -1250,7 +2968,97 @@ def zip_offset(*iterables, **kwargs):
     return zip(*staggered)
 
 
-def sort_together(iterables, key_list=(0,), reverse=False):
+def _sort_together_columns(iterables, key_list, reverse):
+    """Sort the columns in *iterables* by sorting a list of row indexes,
+    so no tuples are made for the rows.
+
+    """
+    columns = [
+        it if isinstance(it, (Sequence, array)) else list(it)
+        for it in iterables
+    ]
+    if not columns:
+        return []
+
+    size = min(len(column) for column in columns)
+    key_columns = [columns[i] for i in key_list]
+    if len(key_columns) == 1:
+        key = key_columns[0].__getitem__
+    else:
+        key = lambda i: tuple(column[i] for column in key_columns)
+    order = sorted(range(size), key=key, reverse=reverse)
+
+    ret = []
+    for column in columns:
+        values = map(column.__getitem__, order)
+        if isinstance(column, array):
+            ret.append(array(column.typecode, values))
+        else:
+            ret.append(list(values))
+
+    return ret
+
+
+def _read_sorted_run(f, position, count, size):
+    """Yield the *count* rows pickled from *position* in the file *f*,
+    reading *size* of them at a time. Other readers may move the file
+    position in between reads.
+
+    """
+    while count:
+        f.seek(position)
+        load_row = Unpickler(f).load
+        block = [load_row() for _ in range(min(size, count))]
+        count -= len(block)
+        position = f.tell()
+        for row in block:
+            yield row
+
+
+def _sort_together_runs(iterables, key, reverse, max_run):
+    """Sort the rows of *iterables* in runs of *max_run*, and return an
+    iterator that merges them.
+
+    If there's more than one run, they're all pickled to a temporary file
+    (one row at a time), and they're read back in blocks that together hold
+    no more than *max_run* rows. Only one run is held in memory at a time.
+
+    """
+    rows = zip(*iterables)
+    run = take(max_run, rows)
+    run.sort(key=key, reverse=reverse)
+    next_row = next(rows, _marker)
+    if next_row is _marker:
+        return iter(run)
+
+    spill = TemporaryFile()
+    pickler = Pickler(spill, HIGHEST_PROTOCOL)
+    bounds = []
+    while True:
+        bounds.append((spill.tell(), len(run)))
+        for row in run:
+            pickler.dump(row)
+            # Each row must be readable on its own
+            pickler.clear_memo()
+        if next_row is _marker:
+            break
+
+        run = [next_row]
+        run.extend(islice(rows, max_run - 1))
+        run.sort(key=key, reverse=reverse)
+        next_row = next(rows, _marker)
+
+    size = max(max_run // len(bounds), 1)
+    runs = [
+        _read_sorted_run(spill, position, count, size)
+        for position, count in bounds
+    ]
+    return collate(*runs, key=key, reverse=reverse)
+
+
+def sort_together(
+    iterables, key_list=(0,), reverse=False, columnar=False, max_run=None
+):
     """Return the input iterables sorted together, with *key_list* as the
     priority for sorting. All iterables are trimmed to the length of the
     shortest one.
@@ -1277,13 +3085,77 @@ def sort_together(iterables, key_list=(0,), reverse=False):
         >>> sort_together([(1, 2, 3), ('c', 'b', 'a')], reverse=True)
         [(3, 2, 1), ('a', 'b', 'c')]
 
+    Set *columnar* to ``True`` to sort a list of row indexes and then use it
+    to rearrange each column, rather than making a tuple for each row and
+    transposing the sorted rows. The columns are returned as lists, except
+    that :class:`array.array` columns are returned as arrays with the same
+    type code::
+
+        >>> from array import array
+        >>> iterables = [array('i', [3, 1, 2]), 'abc']
+        >>> sort_together(iterables, columnar=True)
+        [array('i', [1, 2, 3]), ['b', 'c', 'a']]
+
+    In that case, input iterables that aren't sequences are read into lists,
+    so they must be finite.
+
+    For inputs too large to sort in memory, set *max_run* to the number of
+    rows to sort at a time. Each sorted run is pickled to a temporary file,
+    and the runs are merged with :func:`collate`. Since the results wouldn't
+    fit in memory either, an iterator over the sorted rows is returned
+    instead of a list of columns::
+
+        >>> iterables = [(4, 3, 2, 1), ('a', 'b', 'c', 'd')]
+        >>> list(sort_together(iterables, max_run=2))
+        [(1, 'd'), (2, 'c'), (3, 'b'), (4, 'a')]
+
+    The rows must support the :mod:`pickle` protocol. Either way, the sort
+    is stable.
+
     """
+    if max_run is not None:
+        if max_run < 1:
+            raise ValueError('max_run must be at least 1')
+        if columnar:
+            raise ValueError('columnar output cannot be used with max_run')
+        return _sort_together_runs(
+            iterables, itemgetter(*key_list), reverse, max_run
+        )
+
+    if columnar:
+        return _sort_together_columns(iterables, key_list, reverse)
+
     return list(zip(*sorted(zip(*iterables),
                             key=itemgetter(*key_list),
                             reverse=reverse)))
 
 
-def unzip(iterable):
+def _unzip_batches(rows, width, size):
+    """Yield a tuple with *width* columns for each *size* rows of *rows*.
+    Like :func:`unzip`, each column stops at the first row that's too short
+    to have an item for it.
+
+    """
+    stopped = width  # The columns from this index on have stopped
+    for chunk in chunked(rows, size):
+        # Transposing with zip() is fast, but it stops all the columns at
+        # the shortest row, so fall back to copying items one at a time if
+        # there's a row that's too short.
+        columns = list(islice(zip(*chunk), stopped))
+        if len(columns) < stopped:
+            columns = [[] for _ in range(stopped)]
+            for row in chunk:
+                stopped = min(stopped, len(row))
+                for i in range(stopped):
+                    columns[i].append(row[i])
+
+        columns.extend(() for _ in range(width - len(columns)))
+        yield tuple(columns)
+        if not stopped:
+            break
+
+
+def unzip(iterable, materialize=None, typecodes=None, batch_size=None):
     """The inverse of :func:`zip`, this function disaggregates the elements
     of the zipped *iterable*.
 
@@ -1302,14 +3174,79 @@ def unzip(iterable):
     *iterable* into memory. Note, however, that this function uses
     :func:`itertools.tee` and thus may require significant storage.
 
+    If you need all of the columns at once anyway, set *materialize* to
+    ``'list'`` to read *iterable* in a single pass, appending each row's
+    items to a list for each column:
+
+        >>> iterable = [('a', 1), ('b', 2), ('c', 3), ('d', 4)]
+        >>> unzip(iterable, materialize='list')
+        (['a', 'b', 'c', 'd'], [1, 2, 3, 4])
+
+    Set *materialize* to ``'array'`` to store the columns in
+    :class:`array.array` objects instead, which is more compact for numeric
+    data. *typecodes* gives the type code for each column, or a single type
+    code for all of them:
+
+        >>> iterable = [(1, 1.5), (2, 2.5), (3, 3.5)]
+        >>> unzip(iterable, materialize='array', typecodes='id')
+        (array('i', [1, 2, 3]), array('d', [1.5, 2.5, 3.5]))
+
+    To process the columns in lockstep without storing them all, set
+    *batch_size*. An iterator is returned that yields a tuple of columns for
+    each *batch_size* rows, with the columns stored as tuples (or as lists
+    or arrays, according to *materialize*):
+
+        >>> iterable = [('a', 1), ('b', 2), ('c', 3), ('d', 4), ('e', 5)]
+        >>> for letters, numbers in unzip(iterable, batch_size=2):
+        ...     print(letters, numbers)
+        ('a', 'b') (1, 2)
+        ('c', 'd') (3, 4)
+        ('e',) (5,)
+
+    These modes transpose the rows in chunks with :func:`zip`, rather than
+    using :func:`itertools.tee`.
+
     """
+    if materialize not in (None, 'list', 'array'):
+        raise ValueError("materialize must be None, 'list', or 'array'")
+    if (materialize == 'array') and (typecodes is None):
+        raise ValueError("typecodes are required for materialize='array'")
+    if (batch_size is not None) and (batch_size < 1):
+        raise ValueError('batch_size must be at least 1')
+
     head, iterable = spy(iter(iterable))
     if not head:
         # empty iterable, e.g. zip([], [], [])
-        return ()
+        return iter(()) if (batch_size is not None) else ()
     # spy returns a one-length iterable as head
     head = head[0]
-    iterables = tee(iterable, len(head))
+    width = len(head)
+
+    if (materialize is not None) or (batch_size is not None):
+        if materialize == 'array':
+            if len(typecodes) == 1:
+                typecodes = typecodes * width
+            elif len(typecodes) != width:
+                raise ValueError('typecodes must have one code per column')
+            factories = [partial(array, code) for code in typecodes]
+        elif materialize == 'list':
+            factories = [list] * width
+        else:
+            factories = [tuple] * width
+
+        if batch_size is not None:
+            return (
+                tuple(f(c) for f, c in zip(factories, columns))
+                for columns in _unzip_batches(iterable, width, batch_size)
+            )
+
+        ret = tuple(f() for f in factories)
+        for columns in _unzip_batches(iterable, width, 1024):
+            for column, values in zip(ret, columns):
+                column.extend(values)
+        return ret
+
+    iterables = tee(iterable, width)
 
     def itemgetter(i):
         def getter(obj):
@@ -1331,7 +3268,16 @@ def unzip(iterable):
     return tuple(map(itemgetter(i), it) for i, it in enumerate(iterables))
 
 
-def divide(n, iterable):
+# Types whose items can be read by index in constant time. Other sequences,
+# like deque, may take time proportional to their length.
+def _is_indexable(obj):
+    # A deque is a Sequence, but indexing into its middle isn't constant-time
+    if isinstance(obj, SequenceView):
+        obj = obj._target
+    return isinstance(obj, Sequence) and not isinstance(obj, deque)
+
+
+def divide(n, iterable, length=None):
     """Divide the elements from *iterable* into *n* parts, maintaining
     order.
 
@@ -1355,24 +3301,91 @@ def divide(n, iterable):
         >>> [list(c) for c in children]
         [[1], [2], [3], [], []]
 
-    This function will exhaust the iterable before returning and may require
-    significant storage. If order is not important, see :func:`distribute`,
-    which does not first pull the iterable into memory.
+    If *iterable* is a sequence (other than a ``deque``), like a ``list``,
+    ``range``, or :class:`SequenceView`, the parts are read from it by index,
+    without copying it. Changes made to it before the parts are consumed will
+    be reflected in them, and if it's shortened, the parts that go past its
+    new end will raise ``IndexError``. Otherwise, this function will exhaust
+    the iterable before returning and may require significant storage. If
+    order is not important, see :func:`distribute`, which does not first pull
+    the iterable into memory.
+
+    If the number of items in *iterable* is known, give it as *length*, and
+    the parts will read from *iterable* as they're consumed:
+
+        >>> first, second = divide(2, iter('abcdef'), length=6)
+        >>> next(first), list(second), list(first)
+        ('a', ['d', 'e', 'f'], ['b', 'c'])
+
+    No items are stored if the parts are consumed in order. If *iterable*
+    has fewer than *length* items, the last parts will be short; if it has
+    more, the extra items are left out.
 
     """
     if n < 1:
         raise ValueError('n must be at least 1')
+    if length is not None and length < 0:
+        raise ValueError('length must be non-negative')
+
+    if length is None and _is_indexable(iterable):
+        seq = iterable
+    elif length is None:
+        seq = tuple(iterable)
+    else:
+        seq = None
+        item_count = length
 
-    seq = tuple(iterable)
-    q, r = divmod(len(seq), n)
+    if seq is not None:
+        item_count = len(seq)
+    q, r = divmod(item_count, n)
 
-    ret = []
+    bounds = []
     for i in range(n):
         start = (i * q) + (i if i < r else r)
         stop = ((i + 1) * q) + (i + 1 if i + 1 < r else r)
-        ret.append(iter(seq[start:stop]))
+        bounds.append((start, stop))
 
-    return ret
+    if seq is not None:
+        return [
+            map(seq.__getitem__, range(start, stop)) for start, stop in bounds
+        ]
+
+    return _divide_lazily(iter(iterable), bounds)
+
+
+def _divide_lazily(it, bounds):
+    # Items are read in order. Those for parts that come before the one being
+    # consumed are stored in their queues until they're needed.
+    queues = [deque() for _ in bounds]
+    # The number of items that have been read, and the part the next item
+    # belongs to
+    state = [0, 0]
+
+    def part(index):
+        queue = queues[index]
+        start, stop = bounds[index]
+        while True:
+            if queue:
+                yield queue.popleft()
+                continue
+
+            pos, owner = state
+            if pos >= stop:
+                return
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            while pos >= bounds[owner][1]:
+                owner += 1
+            state[:] = [pos + 1, owner]
+
+            if owner == index:
+                yield item
+            else:
+                queues[owner].append(item)
+
+    return [part(i) for i in range(len(bounds))]
 
 
 def always_iterable(obj, base_type=(text_type, binary_type)):
@@ -1864,7 +3877,7 @@ def consecutive_groups(iterable, ordering=lambda x: x):
         yield map(itemgetter(1), g)
 
 
-def difference(iterable, func=sub):
+def difference(iterable, func=sub, vectorize=True):
     """By default, compute the first difference of *iterable* using
     :func:`operator.sub`.
 
@@ -1893,7 +3906,16 @@ def difference(iterable, func=sub):
         >>> list(difference(iterable, func))
         [1, 2, 3, 4, 5]
 
+    If *iterable* is a one-dimensional NumPy array with a numeric type and
+    *func* is :func:`operator.sub`, the differences are computed all at once
+    with array arithmetic. The items are the same as they would be otherwise.
+    Set *vectorize* to ``False`` to always compute them item by item.
+
     """
+    arr = _numeric_ndarray(iterable) if vectorize else None
+    if (arr is not None) and (func is sub):
+        return chain(arr[:1], arr[1:] - arr[:-1])
+
     a, b = tee(iterable)
     try:
         item = next(b)
@@ -1946,6 +3968,268 @@ class SequenceView(Sequence):
         return '{}({})'.format(self.__class__.__name__, repr(self._target))
 
 
+class LRUSet(object):
+    """A set that remembers at most *maxsize* items, forgetting the least
+    recently used item to make room for new ones. Checking whether an item
+    is in the set counts as using it.
+
+        >>> s = LRUSet(2)
+        >>> s.add('a')
+        >>> s.add('b')
+        >>> 'a' in s  # 'b' is now the least recently used item
+        True
+        >>> s.add('c')
+        >>> 'b' in s
+        False
+
+    This can be passed to :func:`unique_everseen` to remove duplicates from
+    an infinite iterable in bounded memory, as long as repeated items are
+    close enough together.
+
+    """
+    def __init__(self, maxsize):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self._maxsize = maxsize
+        self._items = OrderedDict()
+
+    def __contains__(self, item):
+        items = self._items
+        if item not in items:
+            return False
+        # Move the item to the end
+        items[item] = items.pop(item)
+        return True
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        items = self._items
+        if item in items:
+            items[item] = items.pop(item)
+            return
+        if len(items) >= self._maxsize:
+            items.popitem(last=False)
+        items[item] = None
+
+
+def _hash_positions(h, count, size):
+    """Return *count* positions in ``range(size)`` derived from the integer
+    hash *h*, for :class:`BloomFilter` and :class:`CountMinSketch`.
+
+    """
+    # Double hashing: the i-th position is h1 + i * h2. The two hashes come
+    # from mixing the bits of h (which is often the item itself for
+    # integers) with the SplitMix64 finalizer.
+    mask = 0xffffffffffffffff
+    h &= mask
+    h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & mask
+    h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & mask
+    h ^= h >> 31
+    h1 = h & 0xffffffff
+    h2 = (h >> 32) | 1
+    return [(h1 + i * h2) % size for i in range(count)]
+
+
+class BloomFilter(object):
+    """A set-like object for hashable items that uses a fixed amount of
+    memory, chosen so that the probability of mistaking an item for one that
+    has been added is about *error_rate* after *capacity* items have been
+    added. Items that have been added are always found.
+
+        >>> b = BloomFilter(1000)
+        >>> b.add('a')
+        >>> 'a' in b
+        True
+        >>> 'b' in b
+        False
+
+    This can be passed to :func:`unique_everseen` to remove duplicates from
+    an iterable with many distinct items, if losing an occasional unique item
+    is acceptable.
+
+    Items are located with their ``hash()``, so results may vary between
+    processes for strings and other types with randomized hashes.
+
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        if not (0 < error_rate < 1):
+            raise ValueError('error_rate must be between 0 and 1')
+
+        # The usual optimal sizes: m = -n * ln(p) / ln(2) ** 2 bits, and
+        # k = m / n * ln(2) hash functions.
+        size = -capacity * log(error_rate) / (log(2) ** 2)
+        self._size = max(8, int(ceil(size)))
+        self._hashes = max(1, int(round(self._size * log(2) / capacity)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def _positions(self, item):
+        return _hash_positions(hash(item), self._hashes, self._size)
+
+    def __contains__(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            if not (bits[position >> 3] & (1 << (position & 7))):
+                return False
+        return True
+
+    def add(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+
+
+class CountMinSketch(object):
+    """A counter for hashable items that uses a fixed amount of memory: *depth*
+    rows of *width* counters each.
+
+        >>> c = CountMinSketch(1000)
+        >>> c.add('a')
+        >>> c.add('a', 2)
+        >>> c['a'], c['b']
+        (3, 0)
+
+    The count for an item may be too high if it shares counters with other
+    items, but it's never too low. With *n* added in total, the error is at
+    most about ``2 * n / width`` with a probability that increases with
+    *depth*. Items are located with ``key(item)``, which must return an
+    integer and defaults to :func:`hash`.
+
+    :func:`ngram_counts` returns one of these when its *width* argument is
+    given.
+
+    """
+    def __init__(self, width, depth=4, key=hash):
+        if width < 1:
+            raise ValueError('width must be at least 1')
+        if depth < 1:
+            raise ValueError('depth must be at least 1')
+        self._width = width
+        self._rows = [[0] * width for _ in range(depth)]
+        self._key = key
+
+    def _positions(self, h):
+        return _hash_positions(h, len(self._rows), self._width)
+
+    def _add_hash(self, h, count=1):
+        for row, position in zip(self._rows, self._positions(h)):
+            row[position] += count
+
+    def add(self, item, count=1):
+        self._add_hash(self._key(item), count)
+
+    def __getitem__(self, item):
+        positions = self._positions(self._key(item))
+        return min(row[p] for row, p in zip(self._rows, positions))
+
+
+class _RingBuffer(Sequence):
+    """A list-backed circular buffer that holds at most *maxlen* items and
+    supports indexing in constant time. Appending to a full buffer evicts its
+    oldest item.
+
+    """
+    def __init__(self, maxlen):
+        self._items = [None] * maxlen
+        self._maxlen = maxlen
+        self._start = 0
+        self._len = 0
+
+    def append(self, item):
+        """Add *item* to the right side of the buffer. If that evicted an item
+        from the left side, return it. Otherwise return ``_marker``.
+
+        """
+        maxlen = self._maxlen
+        if self._len < maxlen:
+            self._items[(self._start + self._len) % maxlen] = item
+            self._len += 1
+            return _marker
+        if not maxlen:
+            return item
+
+        start = self._start
+        evicted = self._items[start]
+        self._items[start] = item
+        self._start = (start + 1) % maxlen
+        return evicted
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+
+        if index < 0:
+            index += self._len
+        if not (0 <= index < self._len):
+            raise IndexError('ring buffer index out of range')
+        return self._items[(self._start + index) % self._maxlen]
+
+    def __iter__(self):
+        stop = self._start + self._len
+        tail = max(stop - self._maxlen, 0)
+        return chain(
+            islice(self._items, self._start, stop), islice(self._items, tail)
+        )
+
+    def __len__(self):
+        return self._len
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, list(self))
+
+
+class _SpillFile(object):
+    """An append-only sequence that pickles its items to an anonymous
+    temporary file.
+
+    The position of each pickle is stored in a second file as a fixed-width
+    record, so the memory used doesn't grow with the number of items.
+
+    """
+    _record = Struct('<Q')
+
+    def __init__(self):
+        self._data = TemporaryFile()
+        self._positions = TemporaryFile()
+        self._end = 0
+        self._len = 0
+
+    def append(self, item):
+        self._data.seek(self._end)
+        dump(item, self._data, HIGHEST_PROTOCOL)
+
+        self._positions.seek(self._len * self._record.size)
+        self._positions.write(self._record.pack(self._end))
+
+        self._end = self._data.tell()
+        self._len += 1
+
+    def __getitem__(self, index):
+        if not (0 <= index < self._len):
+            raise IndexError('spill file index out of range')
+
+        size = self._record.size
+        self._positions.seek(index * size)
+        position, = self._record.unpack(self._positions.read(size))
+
+        self._data.seek(position)
+        return load(self._data)
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        """Remove all of the items, and free the space they used."""
+        for f in (self._data, self._positions):
+            f.seek(0)
+            f.truncate()
+        self._end = 0
+        self._len = 0
+
+
 class seekable(object):
     """Wrap an iterator to allow for seeking backward and forward. This
     progressively caches the items in the source iterable so they can be
@@ -1996,11 +4280,50 @@ class seekable(object):
         >>> elements
         SequenceView(['0', '1', '2', '3'])
 
+    To limit the size of the cache, set *maxlen*. Only the most recent
+    *maxlen* items will be kept, and seeking to an index before them raises
+    ``IndexError``:
+
+        >>> it = seekable(range(10), maxlen=3)
+        >>> it.seek(6)
+        >>> list(it.elements())
+        [3, 4, 5]
+        >>> it.seek(3)
+        >>> next(it)
+        3
+        >>> it.seek(2)
+        Traceback (most recent call last):
+        ...
+        IndexError: cannot seek to index 2: items before index 3 are not cached
+
+    Set *spill* to ``True`` as well to keep the items that fall out of the
+    cache in a temporary file instead of discarding them. They're pickled, so
+    they must support the :mod:`pickle` protocol. Any index can then be sought
+    to while memory use stays bounded by *maxlen*:
+
+        >>> it = seekable(range(10), maxlen=3, spill=True)
+        >>> it.seek(6)
+        >>> it.seek(2)
+        >>> next(it), next(it)
+        (2, 3)
+
+    Items in the temporary file are not included in :meth:`elements`.
+
     """
 
-    def __init__(self, iterable):
+    def __init__(self, iterable, maxlen=None, spill=False):
         self._source = iter(iterable)
-        self._cache = []
+        if maxlen is None:
+            if spill:
+                raise ValueError('spill requires maxlen to be set')
+            self._cache = []
+        elif maxlen < 0:
+            raise ValueError('maxlen must be at least 0')
+        else:
+            self._cache = _RingBuffer(maxlen)
+        self._maxlen = maxlen
+        self._spill = _SpillFile() if spill else None
+        self._offset = 0  # Index in the source of the first cached item
         self._index = None
 
     def __iter__(self):
@@ -2008,8 +4331,12 @@ class seekable(object):
 
     def __next__(self):
         if self._index is not None:
+            position = self._index - self._offset
             try:
-                item = self._cache[self._index]
+                if position < 0:
+                    item = self._spill[self._index]
+                else:
+                    item = self._cache[position]
             except IndexError:
                 self._index = None
             else:
@@ -2017,7 +4344,14 @@ class seekable(object):
                 return item
 
         item = next(self._source)
-        self._cache.append(item)
+        if self._maxlen is None:
+            self._cache.append(item)
+        else:
+            evicted = self._cache.append(item)
+            if evicted is not _marker:
+                self._offset += 1
+                if self._spill is not None:
+                    self._spill.append(evicted)
         return item
 
     next = __next__
@@ -2026,8 +4360,14 @@ class seekable(object):
         return SequenceView(self._cache)
 
     def seek(self, index):
+        if (index < self._offset) and (self._spill is None):
+            raise IndexError(
+                'cannot seek to index {}: items before index {} are not '
+                'cached'.format(index, self._offset)
+            )
+
         self._index = index
-        remainder = index - len(self._cache)
+        remainder = index - (self._offset + len(self._cache))
         if remainder > 0:
             consume(self, remainder)
 
@@ -2154,7 +4494,76 @@ def make_decorator(wrapping_func, result_index=0):
     return decorator
 
 
-def map_reduce(iterable, keyfunc, valuefunc=None, reducefunc=None):
+def _map_reduce_fold(
+    iterable, keyfunc, valuefunc=None, combinefunc=None, initfunc=None
+):
+    """Do the mapping step of :func:`map_reduce`, and combine the values
+    if there's a *combinefunc*.
+
+    """
+    valuefunc = (lambda x: x) if (valuefunc is None) else valuefunc
+
+    if combinefunc is None:
+        ret = defaultdict(list)
+        for item in iterable:
+            key = keyfunc(item)
+            value = valuefunc(item)
+            ret[key].append(value)
+    elif initfunc is None:
+        ret = defaultdict(None)
+        for item in iterable:
+            key = keyfunc(item)
+            value = valuefunc(item)
+            try:
+                acc = ret[key]
+            except KeyError:
+                ret[key] = value
+            else:
+                ret[key] = combinefunc(acc, value)
+    else:
+        ret = defaultdict(initfunc)
+        for item in iterable:
+            key = keyfunc(item)
+            ret[key] = combinefunc(ret[key], valuefunc(item))
+
+    return ret
+
+
+def _map_reduce_merge(partitions, combinefunc=None):
+    """Merge the dictionaries returned by :func:`_map_reduce_fold` for
+    consecutive partitions of the input.
+
+    """
+    if combinefunc is None:
+        ret = defaultdict(list)
+        for partition in partitions:
+            for key, values in partition.items():
+                ret[key].extend(values)
+        return ret
+
+    ret = defaultdict(None)
+    for partition in partitions:
+        for key, value in partition.items():
+            try:
+                acc = ret[key]
+            except KeyError:
+                ret[key] = value
+            else:
+                ret[key] = combinefunc(acc, value)
+    return ret
+
+
+def map_reduce(
+    iterable,
+    keyfunc,
+    valuefunc=None,
+    reducefunc=None,
+    combinefunc=None,
+    initfunc=None,
+    top_k=None,
+    workers=None,
+    chunk_size=1024,
+):
     """Return a dictionary that maps the items in *iterable* to categories
     defined by *keyfunc*, transforms them with *valuefunc*, and
     then summarizes them by category with *reducefunc*.
@@ -2200,24 +4609,89 @@ def map_reduce(iterable, keyfunc, valuefunc=None, reducefunc=None):
     Note that all items in the iterable are gathered into a list before the
     summarization step, which may require significant storage.
 
+    To avoid that, specify a *combinefunc* that takes two arguments and
+    combines them into one, like :func:`functools.reduce` would. Values are
+    combined as they're produced, so only one value per category is stored.
+    If *reducefunc* is also given, it's called with each category's combined
+    value:
+
+        >>> from operator import add
+        >>> keyfunc = lambda x: x % 2
+        >>> result = map_reduce(range(10), keyfunc, combinefunc=add)
+        >>> sorted(result.items())
+        [(0, 20), (1, 25)]
+
+    If *initfunc* is given, it's called with no arguments to create each
+    category's initial value, and *combinefunc* is called with that value
+    and the first item in the category, and so on. This allows values of
+    a different type than the items to be accumulated:
+
+        >>> initfunc = lambda: (0, 0)  # Running total and count
+        >>> combinefunc = lambda acc, x: (acc[0] + x, acc[1] + 1)
+        >>> reducefunc = lambda acc: acc[0] / float(acc[1])  # Mean
+        >>> result = map_reduce(
+        ...     range(10), keyfunc, None, reducefunc, combinefunc, initfunc
+        ... )
+        >>> sorted(result.items())
+        [(0, 4.0), (1, 5.0)]
+
+    If *top_k* is given, only the *top_k* categories with the largest
+    (reduced) values are returned:
+
+        >>> keyfunc = lambda x: x.upper()
+        >>> valuefunc = lambda x: 1
+        >>> result = map_reduce('abbcccd', keyfunc, valuefunc, None, add,
+        ...                     top_k=2)
+        >>> sorted(result.items(), key=lambda x: x[1], reverse=True)
+        [('C', 3), ('B', 2)]
+
+    If *workers* is given, the input is split into lists of *chunk_size*
+    items with :func:`chunked`, and *workers* processes map (and combine, if
+    there's a *combinefunc*) the lists in parallel with :func:`parallel_map`.
+    The results for each list are then merged in order, using *combinefunc*
+    if there is one. This requires *keyfunc*, *valuefunc*, *combinefunc*,
+    the items, and their keys and values to support the :mod:`pickle`
+    protocol, so e.g. lambda functions can't be used. *combinefunc* must be
+    associative, and *initfunc* isn't supported.
+
     The returned object is a :obj:`collections.defaultdict` with the
     ``default_factory`` set to ``None``, such that it behaves like a normal
     dictionary.
 
     """
-    valuefunc = (lambda x: x) if (valuefunc is None) else valuefunc
-
-    ret = defaultdict(list)
-    for item in iterable:
-        key = keyfunc(item)
-        value = valuefunc(item)
-        ret[key].append(value)
+    if (initfunc is not None) and (combinefunc is None):
+        raise ValueError('initfunc requires combinefunc')
+    if (top_k is not None) and (top_k < 0):
+        raise ValueError('top_k must be at least 0')
+
+    if workers is None:
+        ret = _map_reduce_fold(
+            iterable, keyfunc, valuefunc, combinefunc, initfunc
+        )
+    elif workers < 1:
+        raise ValueError('workers must be at least 1')
+    elif initfunc is not None:
+        raise ValueError('initfunc cannot be used with workers')
+    else:
+        fold = partial(
+            _map_reduce_fold,
+            keyfunc=keyfunc,
+            valuefunc=valuefunc,
+            combinefunc=combinefunc,
+        )
+        partitions = parallel_map(
+            fold, chunked(iterable, chunk_size), workers=workers
+        )
+        ret = _map_reduce_merge(partitions, combinefunc)
 
     if reducefunc is not None:
-        for key, value_list in ret.items():
-            ret[key] = reducefunc(value_list)
+        for key, value in ret.items():
+            ret[key] = reducefunc(value)
 
     ret.default_factory = None
+    if top_k is not None:
+        top_items = nlargest(top_k, ret.items(), key=itemgetter(1))
+        ret = defaultdict(None, top_items)
     return ret
 
 
@@ -50,7 +50,23 @@ __all__ = [
 ]
 
 
-def accumulate(iterable, func=operator.add):
+def _numeric_ndarray(obj):
+    """Return *obj* if it is a one-dimensional NumPy array with a numeric
+    data type, and ``None`` otherwise.
+
+    NumPy is never imported here - if *obj* is an array, it's already loaded.
+    Subclasses like masked arrays are rejected, since their arithmetic differs.
+
+    """
+    cls = type(obj)
+    if (cls.__name__ != 'ndarray') or (cls.__module__ != 'numpy'):
+        return None
+    if (obj.ndim != 1) or (obj.dtype.kind not in 'iufc'):
+        return None
+    return obj
+
+
+def accumulate(iterable, func=operator.add, vectorize=True):
     """
     Return an iterator whose items are the accumulated results of a function
     (specified by the optional *func* argument) that takes two arguments.
@@ -66,7 +82,24 @@ def accumulate(iterable, func=operator.add):
     This function is available in the ``itertools`` module for Python 3.2 and
     greater.
 
+    If *iterable* is a one-dimensional NumPy array with a numeric type and
+    *func* is :func:`operator.add` or :func:`operator.mul`, the results are
+    computed all at once with the array's ``cumsum`` or ``cumprod`` methods.
+    The items are the same as they would be otherwise. Set *vectorize* to
+    ``False`` to always accumulate item by item.
+
     """
+    arr = _numeric_ndarray(iterable) if vectorize else None
+    if arr is not None:
+        if func is operator.add:
+            return iter(arr.cumsum(dtype=arr.dtype))
+        if func is operator.mul:
+            return iter(arr.cumprod(dtype=arr.dtype))
+
+    return _accumulate(iterable, func)
+
+
+def _accumulate(iterable, func):
     it = iter(iterable)
     try:
         total = next(it)
@@ -370,7 +403,44 @@ def powerset(iterable):
     return chain.from_iterable(combinations(s, r) for r in range(len(s) + 1))
 
 
-def unique_everseen(iterable, key=None):
+# Markers that distinguish frozen lists and dicts from tuples and frozensets
+_frozen_list = object()
+_frozen_dict = object()
+
+
+def _freeze(obj):
+    """Return a hashable stand-in for *obj*, which is equal to the stand-ins
+    for objects equal to *obj*.
+
+    Lists, tuples, dicts, sets, and bytearrays are converted (recursively).
+    ``TypeError`` is raised for other unhashable objects.
+
+    """
+    try:
+        hash(obj)
+    except TypeError:
+        pass
+    else:
+        return obj
+
+    obj_type = type(obj)
+    if obj_type is list:
+        return _frozen_list, tuple(_freeze(x) for x in obj)
+    elif obj_type is tuple:
+        return tuple(_freeze(x) for x in obj)
+    elif obj_type is dict:
+        return _frozen_dict, frozenset(
+            (k, _freeze(v)) for k, v in obj.items()
+        )
+    elif obj_type is set:
+        return frozenset(obj)
+    elif obj_type is bytearray:
+        return bytes(obj)
+
+    raise TypeError('unhashable type: {!r}'.format(obj_type.__name__))
+
+
+def unique_everseen(iterable, key=None, seen=None):
     """
     Yield unique elements, preserving order.
 
@@ -380,13 +450,61 @@ def unique_everseen(iterable, key=None):
         ['A', 'B', 'C', 'D']
 
     Sequences with a mix of hashable and unhashable items can be used.
-    The function will be slower (i.e., `O(n^2)`) for unhashable items.
+    Lists, dicts, and sets (and tuples containing them) are converted to
+    hashable equivalents, so they're handled as quickly as hashable items:
+
+        >>> list(unique_everseen([{'a': 1}, {'a': 2}, {'a': 1}]))
+        [{'a': 1}, {'a': 2}]
+
+    The function will be slower (i.e., `O(n^2)`) for other unhashable items.
+
+    To control how the items that have been seen are stored, pass a set-like
+    object with ``__contains__()`` and ``add()`` methods as *seen*. For
+    example, :class:`LRUSet` bounds the number of items that are remembered,
+    and :class:`BloomFilter` uses a fixed amount of memory at the cost of
+    occasionally mistaking an item for one that's been seen:
+
+        >>> from more_itertools import LRUSet
+        >>> list(unique_everseen('ABACBCBA', seen=LRUSet(2)))
+        ['A', 'B', 'C', 'B', 'A']
+
+    Unhashable items are converted as above before they're passed to the
+    *seen* object's methods.
 
     """
+    if seen is not None:
+        seen_add = seen.add
+        for element in iterable:
+            k = element if (key is None) else key(element)
+            try:
+                is_new = k not in seen
+            except TypeError:
+                k = _freeze(k)
+                is_new = k not in seen
+            if is_new:
+                seen_add(k)
+                yield element
+        return
+
     seenset = set()
     seenset_add = seenset.add
     seenlist = []
     seenlist_add = seenlist.append
+
+    def unhashable_is_new(k):
+        try:
+            k = _freeze(k)
+        except TypeError:
+            if k in seenlist:
+                return False
+            seenlist_add(k)
+            return True
+
+        if k in seenset:
+            return False
+        seenset_add(k)
+        return True
+
     if key is None:
         for element in iterable:
             try:
@@ -394,8 +512,7 @@ def unique_everseen(iterable, key=None):
                     seenset_add(element)
                     yield element
             except TypeError:
-                if element not in seenlist:
-                    seenlist_add(element)
+                if unhashable_is_new(element):
                     yield element
     else:
         for element in iterable:
@@ -405,8 +522,7 @@ def unique_everseen(iterable, key=None):
                     seenset_add(k)
                     yield element
             except TypeError:
-                if k not in seenlist:
-                    seenlist_add(k)
+                if unhashable_is_new(k):
                     yield element
 
 
@@ -0,0 +1,339 @@
+from __future__ import division, print_function, unicode_literals
+
+from doctest import DocTestSuite
+from sys import version_info
+from unittest import TestCase, skipIf
+
+# The aio module requires Python 3.7+, and uses syntax that's not available
+# on earlier versions, so these tests drive it with plain function calls
+# rather than async syntax.
+if version_info >= (3, 7):
+    import asyncio
+    from more_itertools import aio
+else:
+    aio = None
+
+
+def load_tests(loader, tests, ignore):
+    if aio is not None:
+        tests.addTests(DocTestSuite('more_itertools.aio'))
+    return tests
+
+
+def run(awaitable):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(awaitable)
+    finally:
+        loop.close()
+
+
+def collect(ait, loop=None):
+    """Drain the asynchronous iterator *ait* into a list."""
+    own_loop = loop is None
+    if own_loop:
+        loop = asyncio.new_event_loop()
+    ret = []
+    try:
+        while True:
+            try:
+                ret.append(loop.run_until_complete(ait.__anext__()))
+            except StopAsyncIteration:
+                return ret
+    finally:
+        if own_loop:
+            loop.close()
+
+
+def drain(ait, loop):
+    """Return a future that resolves to a list of the items from the
+    asynchronous iterator *ait*, which is consumed by callbacks on *loop*.
+
+    """
+    ret = []
+    future = loop.create_future()
+
+    def step(fut=None):
+        if fut is not None:
+            try:
+                ret.append(fut.result())
+            except StopAsyncIteration:
+                future.set_result(ret)
+                return
+            except Exception as e:
+                future.set_exception(e)
+                return
+        future_item = asyncio.ensure_future(ait.__anext__(), loop=loop)
+        future_item.add_done_callback(step)
+
+    loop.call_soon(step)
+    return future
+
+
+class SlowIterator(object):
+    """Asynchronous iterator that sleeps for the given number of seconds
+    before producing each item.
+
+    """
+    def __init__(self, delays_and_items):
+        self._it = iter(delays_and_items)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        try:
+            delay, item = next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+        return asyncio.sleep(delay, result=item)
+
+
+@skipIf(aio is None, 'Python 3.7+ is required')
+class AsyncTestCase(TestCase):
+    pass
+
+
+class ChunkedTests(AsyncTestCase):
+    """Tests for ``chunked()``"""
+
+    def test_even(self):
+        self.assertEqual(
+            collect(aio.chunked('ABCDEF', 3)),
+            [['A', 'B', 'C'], ['D', 'E', 'F']]
+        )
+
+    def test_odd(self):
+        self.assertEqual(
+            collect(aio.chunked(SlowIterator((0, c) for c in 'ABCDE'), 3)),
+            [['A', 'B', 'C'], ['D', 'E']]
+        )
+
+    def test_max_wait(self):
+        """A partial chunk should be emitted when the source stalls, and the
+        item that was being waited for shouldn't be lost.
+
+        """
+        source = SlowIterator(
+            [(0, 'A'), (0, 'B'), (0.5, 'C'), (0, 'D'), (0, 'E'), (0, 'F')]
+        )
+        self.assertEqual(
+            collect(aio.chunked(source, 3, max_wait=0.05)),
+            [['A', 'B'], ['C', 'D', 'E'], ['F']]
+        )
+
+    def test_max_wait_fast_source(self):
+        self.assertEqual(
+            collect(aio.chunked(range(7), 3, max_wait=10)),
+            [[0, 1, 2], [3, 4, 5], [6]]
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            collect(aio.chunked('ABC', 0))
+
+
+class WindowedTests(AsyncTestCase):
+    """Tests for ``windowed()``"""
+
+    def test_basic(self):
+        self.assertEqual(
+            collect(aio.windowed(range(5), 3)),
+            [(0, 1, 2), (1, 2, 3), (2, 3, 4)]
+        )
+
+    def test_fillvalue_and_step(self):
+        self.assertEqual(
+            collect(aio.windowed(range(6), 3, fillvalue='!', step=2)),
+            [(0, 1, 2), (2, 3, 4), (4, 5, '!')]
+        )
+
+    def test_short(self):
+        self.assertEqual(
+            collect(aio.windowed([1, 2], 3)), [(1, 2, None)]
+        )
+
+
+class PeekableTests(AsyncTestCase):
+    """Tests for ``peekable()``"""
+
+    def test_peek(self):
+        loop = asyncio.new_event_loop()
+        try:
+            p = aio.peekable(SlowIterator((0, c) for c in 'AB'))
+            self.assertEqual(loop.run_until_complete(p.peek()), 'A')
+            self.assertEqual(loop.run_until_complete(p.peek()), 'A')
+            self.assertEqual(loop.run_until_complete(p.__anext__()), 'A')
+            self.assertEqual(collect(p, loop), ['B'])
+            self.assertEqual(loop.run_until_complete(p.peek('x')), 'x')
+            with self.assertRaises(StopAsyncIteration):
+                loop.run_until_complete(p.peek())
+        finally:
+            loop.close()
+
+    def test_prepend(self):
+        loop = asyncio.new_event_loop()
+        try:
+            p = aio.peekable('CD')
+            self.assertEqual(loop.run_until_complete(p.peek()), 'C')
+            p.prepend('A', 'B')
+            self.assertEqual(collect(p, loop), ['A', 'B', 'C', 'D'])
+        finally:
+            loop.close()
+
+
+class SpyTests(AsyncTestCase):
+    """Tests for ``spy()``"""
+
+    def test_basic(self):
+        loop = asyncio.new_event_loop()
+        try:
+            head, it = loop.run_until_complete(aio.spy('abcd', 3))
+            self.assertEqual(head, ['a', 'b', 'c'])
+            self.assertEqual(collect(it, loop), ['a', 'b', 'c', 'd'])
+        finally:
+            loop.close()
+
+    def test_too_many(self):
+        loop = asyncio.new_event_loop()
+        try:
+            head, it = loop.run_until_complete(aio.spy('ab', 5))
+            self.assertEqual(head, ['a', 'b'])
+            self.assertEqual(collect(it, loop), ['a', 'b'])
+        finally:
+            loop.close()
+
+
+class FirstTests(AsyncTestCase):
+    """Tests for ``first()``"""
+
+    def test_many(self):
+        self.assertEqual(run(aio.first(SlowIterator([(0, 4), (0, 5)]))), 4)
+
+    def test_default(self):
+        self.assertEqual(run(aio.first([], 'boo')), 'boo')
+
+    def test_empty_stop_iteration(self):
+        with self.assertRaises(ValueError):
+            run(aio.first([]))
+
+
+class IlenTests(AsyncTestCase):
+    """Tests for ``ilen()``"""
+
+    def test_ilen(self):
+        self.assertEqual(run(aio.ilen(SlowIterator((0, i) for i in '123'))), 3)
+        self.assertEqual(run(aio.ilen([])), 0)
+
+
+class InterleaveTests(AsyncTestCase):
+    """Tests for ``interleave()``"""
+
+    def test_even(self):
+        self.assertEqual(
+            collect(aio.interleave([1, 4, 7], [2, 5, 8], [3, 6, 9])),
+            [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        )
+
+    def test_short(self):
+        self.assertEqual(
+            collect(aio.interleave([1, 4], [2, 5, 7], [3, 6, 8])),
+            [1, 2, 3, 4, 5, 6]
+        )
+
+
+class CollateTests(AsyncTestCase):
+    """Tests for ``collate()``"""
+
+    def test_default(self):
+        iterables = [range(4), range(7), range(3, 6)]
+        self.assertEqual(
+            collect(aio.collate(*iterables)),
+            sorted(x for it in iterables for x in it)
+        )
+
+    def test_key_and_reverse(self):
+        iterables = [[(1, 'a'), (0, 'b')], [(2, 'c'), (0, 'd')]]
+        self.assertEqual(
+            collect(
+                aio.collate(
+                    *iterables, key=lambda x: x[0], reverse=True
+                )
+            ),
+            [(2, 'c'), (1, 'a'), (0, 'b'), (0, 'd')]
+        )
+
+    def test_empty(self):
+        self.assertEqual(collect(aio.collate()), [])
+        self.assertEqual(collect(aio.collate([], [1])), [1])
+
+
+class BucketTests(AsyncTestCase):
+    """Tests for ``bucket()``"""
+
+    def test_basic(self):
+        iterable = [10, 20, 30, 11, 21, 31, 12, 22, 23, 33]
+        D = aio.bucket(iterable, key=lambda x: 10 * (x // 10))
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(collect(D[10], loop), [10, 11, 12])
+            self.assertEqual(collect(D[20], loop), [20, 21, 22, 23])
+            self.assertEqual(collect(D[30], loop), [30, 31, 33])
+            self.assertEqual(collect(D[40], loop), [])
+        finally:
+            loop.close()
+
+    def test_validator(self):
+        D = aio.bucket('aAbB', key=str.islower, validator=bool)
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(collect(D[False], loop), [])
+            self.assertEqual(collect(D[True], loop), ['a', 'b'])
+        finally:
+            loop.close()
+
+    def test_concurrent(self):
+        iterable = SlowIterator((0.001, i) for i in range(20))
+        D = aio.bucket(iterable, key=lambda x: x % 2)
+        loop = asyncio.new_event_loop()
+        try:
+            evens, odds = loop.run_until_complete(
+                asyncio.gather(drain(D[0], loop), drain(D[1], loop))
+            )
+        finally:
+            loop.close()
+        self.assertEqual(evens, list(range(0, 20, 2)))
+        self.assertEqual(odds, list(range(1, 20, 2)))
+
+
+class SideEffectTests(AsyncTestCase):
+    """Tests for ``side_effect()``"""
+
+    def test_individual(self):
+        seen = []
+        before = lambda: seen.append('before')
+        after = lambda: seen.append('after')
+        self.assertEqual(
+            collect(aio.side_effect(seen.append, [1, 2], before=before,
+                                    after=after)),
+            [1, 2]
+        )
+        self.assertEqual(seen, ['before', 1, 2, 'after'])
+
+    def test_chunked(self):
+        seen = []
+        self.assertEqual(
+            collect(aio.side_effect(seen.append, range(5), chunk_size=2)),
+            [0, 1, 2, 3, 4]
+        )
+        self.assertEqual(seen, [[0, 1], [2, 3], [4]])
+
+    def test_awaitable(self):
+        seen = []
+
+        def func(item):
+            seen.append(item)
+            return asyncio.sleep(0)
+
+        self.assertEqual(collect(aio.side_effect(func, 'ab')), ['a', 'b'])
+        self.assertEqual(seen, ['a', 'b'])
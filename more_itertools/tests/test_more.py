@@ -1,14 +1,16 @@
 from __future__ import division, print_function, unicode_literals
 
-from collections import OrderedDict
+from array import array
+from collections import Counter, OrderedDict, defaultdict, deque
 from decimal import Decimal
 from doctest import DocTestSuite
 from fractions import Fraction
 from functools import partial, reduce
 from heapq import merge
-from io import StringIO
+from io import BytesIO, StringIO
 from itertools import (
     chain,
+    combinations,
     count,
     groupby,
     islice,
@@ -16,17 +18,41 @@ from itertools import (
     product,
     repeat,
 )
+from mmap import ACCESS_READ, mmap
 from operator import add, mul, itemgetter
-from unittest import TestCase
+from os import remove
+from sys import modules, version_info
+from tempfile import NamedTemporaryFile
+from threading import Thread
+from unittest import TestCase, skipIf
 
 from six.moves import filter, map, range, zip
 
 import more_itertools as mi
 
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None
+
 
 def load_tests(loader, tests, ignore):
-    # Add the doctests
-    tests.addTests(DocTestSuite('more_itertools.more'))
+    # Add the doctests, except for parallel_map() if concurrent.futures
+    # isn't available
+    for test in DocTestSuite('more_itertools.more'):
+        if (futures is None) and test.id().endswith('.parallel_map'):
+            continue
+        tests.addTest(test)
     return tests
 
 
@@ -73,6 +99,68 @@ class CollateTests(TestCase):
         self.assertNotEqual(merge.__doc__, mi.collate.__doc__)
         self.assertNotEqual(partial.__doc__, mi.collate.__doc__)
 
+    def test_many(self):
+        """Merging many iterables should match a full sort."""
+        iterables = [range(i, 200, (i % 7) + 1) for i in range(50)]
+        actual = list(mi.collate(*iterables))
+        expected = sorted(chain.from_iterable(iterables))
+        self.assertEqual(actual, expected)
+
+        actual = list(mi.collate(*iterables, key=lambda x: -x, reverse=True))
+        self.assertEqual(actual, expected)
+
+    def test_key_calls(self):
+        """The `key` function should be called once per item."""
+        calls = []
+
+        def key(x):
+            calls.append(x)
+            return x
+
+        iterables = [range(0, 30, 3), range(1, 30, 3), range(2, 30, 3)]
+        actual = list(mi.collate(*iterables, key=key))
+        self.assertEqual(actual, list(range(30)))
+        self.assertEqual(sorted(calls), list(range(30)))
+
+    def test_stable(self):
+        """Items with equal keys come out in the order of their iterables."""
+        iterables = [[(1, 'a'), (2, 'a')], [(1, 'b'), (2, 'b')], [(1, 'c')]]
+        key = itemgetter(0)
+        self.assertEqual(
+            list(mi.collate(*iterables, key=key)),
+            [(1, 'a'), (1, 'b'), (1, 'c'), (2, 'a'), (2, 'b')]
+        )
+        self.assertEqual(
+            list(mi.collate(*(x[::-1] for x in iterables), key=key,
+                            reverse=True)),
+            [(2, 'a'), (2, 'b'), (1, 'a'), (1, 'b'), (1, 'c')]
+        )
+
+    def test_unorderable_items(self):
+        """Only keys are compared, not the items themselves."""
+        iterables = [[{'x': 1}, {'x': 3}], [{'x': 2}]]
+        actual = list(mi.collate(*iterables, key=itemgetter('x')))
+        self.assertEqual(actual, [{'x': 1}, {'x': 2}, {'x': 3}])
+
+    def test_bad_kwargs(self):
+        self.assertRaises(TypeError, lambda: mi.collate([1], foo=1))
+
+    def test_fallback(self):
+        """The merge used on versions where ``heapq.merge`` doesn't accept
+        the keyword arguments should agree with ``collate()``.
+
+        """
+        iterables = [
+            [(1, 'a'), (3, 'a')], [(1, 'b'), (2, 'b')], [], [(2, 'c')]
+        ]
+        for key, reverse in [
+            (None, False), (itemgetter(0), False), (lambda x: -x[0], True)
+        ]:
+            inputs = iterables if not reverse else [x[::-1] for x in iterables]
+            actual = list(mi.more._collate(inputs, key, reverse))
+            expected = list(mi.collate(*inputs, key=key, reverse=reverse))
+            self.assertEqual(actual, expected)
+
 
 class ChunkedTests(TestCase):
     """Tests for ``chunked()``"""
@@ -93,6 +181,66 @@ class ChunkedTests(TestCase):
         )
 
 
+@skipIf(futures is None, 'concurrent.futures is required')
+class ParallelMapTests(TestCase):
+    """Tests for ``parallel_map()``"""
+
+    def test_ordered(self):
+        for chunk_size in (1, 3, 100):
+            actual = list(
+                mi.parallel_map(
+                    lambda x: x * 2, range(50), chunk_size, 4, threads=True
+                )
+            )
+            self.assertEqual(actual, [x * 2 for x in range(50)])
+
+    def test_unordered(self):
+        actual = mi.parallel_map(
+            lambda x: x * 2, range(50), 3, 4, ordered=False, threads=True
+        )
+        self.assertEqual(sorted(actual), [x * 2 for x in range(50)])
+
+    def test_processes(self):
+        actual = list(mi.parallel_map(abs, range(-10, 10), 4, workers=2))
+        self.assertEqual(actual, [abs(x) for x in range(-10, 10)])
+
+    def test_bounded(self):
+        """Only max_pending chunks should be read ahead of the consumer."""
+        consumed = []
+        iterable = mi.side_effect(consumed.append, count())
+        for ordered in (True, False):
+            del consumed[:]
+            it = mi.parallel_map(
+                str, iterable, chunk_size=2, workers=2, ordered=ordered,
+                threads=True, max_pending=3
+            )
+            self.assertEqual(len(mi.take(3, it)), 3)
+            # The pending chunks, plus the one being read and the one whose
+            # results are being yielded
+            self.assertLessEqual(len(consumed), 2 * (3 + 2))
+            it.close()
+
+    def test_exception(self):
+        it = mi.parallel_map(lambda x: 1 // x, [1, 0, 1], threads=True)
+        self.assertEqual(next(it), 1)
+        self.assertRaises(ZeroDivisionError, lambda: next(it))
+
+    def test_invalid(self):
+        for kwargs in [{'chunk_size': 0}, {'max_pending': 0}]:
+            self.assertRaises(
+                ValueError,
+                lambda: mi.parallel_map(str, [1], threads=True, **kwargs)
+            )
+
+    def test_no_futures(self):
+        module = modules['concurrent.futures']
+        modules['concurrent.futures'] = None
+        try:
+            self.assertRaises(ImportError, lambda: mi.parallel_map(str, [1]))
+        finally:
+            modules['concurrent.futures'] = module
+
+
 class FirstTests(TestCase):
     """Tests for ``first()``"""
 
@@ -432,6 +580,39 @@ class PeekableTests(TestCase):
         self.assertEqual(p[-9], 11)
         self.assertRaises(IndexError, lambda: p[-21])
 
+    def test_long_lookahead(self):
+        """Interleaved lookahead, prepending, and advancing should match a
+        list that's manipulated the same way"""
+        p = mi.peekable(range(1000))
+        expected = list(range(1000))
+        for i in range(300):
+            self.assertEqual(p[500 - i], expected[500 - i])
+            self.assertEqual(p[i:i + 3], expected[i:i + 3])
+            self.assertEqual(p[i + 3:i:-1], expected[i + 3:i:-1])
+            self.assertEqual(p[-2000:i:-1], expected[-2000:i:-1])
+            self.assertEqual(p[i:-2000:-1], expected[i:-2000:-1])
+            self.assertEqual(p[i:2000:-3], expected[i:2000:-3])
+            self.assertEqual(next(p), expected.pop(0))
+            if i % 7 == 0:
+                p.prepend(-i, -i - 1)
+                expected[:0] = [-i, -i - 1]
+        self.assertEqual(p[-1], 999)
+        self.assertEqual(p[::-1], expected[::-1])
+        self.assertEqual(list(p), expected)
+
+    def test_slices_after_advancing(self):
+        """Slices should match list slices once some items have been
+        returned, so the cache has a non-zero head"""
+        p = mi.peekable(range(10))
+        p[9]
+        for _ in range(4):
+            next(p)
+        expected = list(range(4, 10))
+        indexes = [None] + list(range(-8, 9))
+        for start, stop, step in product(indexes, indexes, [-3, -1, 1, 2]):
+            index = slice(start, stop, step)
+            self.assertEqual(p[index], expected[index])
+
     def test_prepend_iterable(self):
         """Tests prepending from an iterable"""
         it = mi.peekable(range(5))
@@ -506,6 +687,217 @@ class DistinctPermutationsTests(TestCase):
         ref_output = sorted(set(permutations(iterable)))
         self.assertEqual(test_output, ref_output)
 
+    def test_lexicographic(self):
+        """Permutations of sortable items come out in sorted order."""
+        for iterable in ['', 'a', 'aa', 'ab', 'baa', 'abcab', [2, 1, 2, 0]]:
+            actual = list(mi.distinct_permutations(iterable))
+            expected = sorted(set(permutations(iterable)))
+            self.assertEqual(actual, expected)
+
+    def test_r(self):
+        iterable = ['z', 'a', 'a', 'q', 'q', 'q', 'y']
+        for r in range(len(iterable) + 2):
+            actual = list(mi.distinct_permutations(iterable, r))
+            expected = sorted(set(permutations(iterable, r)))
+            self.assertEqual(actual, expected)
+
+        self.assertRaises(
+            ValueError, lambda: mi.distinct_permutations(iterable, -1)
+        )
+
+    def test_unsortable(self):
+        """Items that can't be ordered are compared for equality only."""
+        iterable = [{'a': 1}, [0], {'a': 1}]
+        actual = list(mi.distinct_permutations(iterable))
+        expected = [
+            ({'a': 1}, {'a': 1}, [0]),
+            ({'a': 1}, [0], {'a': 1}),
+            ([0], {'a': 1}, {'a': 1}),
+        ]
+        self.assertEqual(actual, expected)
+
+        actual = list(mi.distinct_permutations(iterable, 1))
+        self.assertEqual(actual, [({'a': 1},), ([0],)])
+
+    def test_partially_ordered(self):
+        """Items that sort without error but aren't totally ordered are
+        compared for equality only.
+
+        """
+        iterable = [frozenset({1}), frozenset({2}), frozenset({1})]
+        actual = list(mi.distinct_permutations(iterable))
+        expected = set(permutations(iterable))
+        self.assertEqual(len(actual), 3)
+        self.assertEqual(set(actual), expected)
+
+        iterable = [frozenset({1}), frozenset({1, 2}), frozenset({1})]
+        actual = list(mi.distinct_permutations(iterable))
+        self.assertEqual(set(actual), set(permutations(iterable)))
+        self.assertEqual(len(actual), 3)
+
+    def test_key(self):
+        """Items with equal keys are interchangeable, but all are used."""
+        iterable = ['b', 'A', 'a', 'B']
+        key = lambda x: x.lower()
+        actual = list(mi.distinct_permutations(iterable, key=key))
+        self.assertEqual(
+            actual,
+            [
+                ('A', 'a', 'b', 'B'),
+                ('A', 'b', 'a', 'B'),
+                ('A', 'b', 'B', 'a'),
+                ('b', 'A', 'a', 'B'),
+                ('b', 'A', 'B', 'a'),
+                ('b', 'B', 'A', 'a'),
+            ]
+        )
+
+        actual = list(mi.distinct_permutations(iterable, 1, key=key))
+        self.assertEqual(actual, [('A',), ('b',)])
+
+
+class NthProductTests(TestCase):
+    def test_basic(self):
+        iterables = ['ab', 'cde', (), 'f']
+        for args in [iterables[:1], iterables[:2], iterables[1:2] * 3]:
+            for index, expected in enumerate(product(*args)):
+                actual = mi.nth_product(index, *args)
+                self.assertEqual(actual, expected)
+                self.assertEqual(mi.product_index(expected, *args), index)
+
+        self.assertEqual(mi.nth_product(0), ())
+        self.assertEqual(mi.product_index(()), 0)
+
+    def test_negative(self):
+        args = ['abc', range(3)]
+        expected = list(product(*args))
+        for index in range(-len(expected), 0):
+            actual = mi.nth_product(index, *args)
+            self.assertEqual(actual, expected[index])
+
+    def test_invalid(self):
+        args = ['abc', range(3)]
+        for index in (9, -10):
+            self.assertRaises(IndexError, lambda: mi.nth_product(index, *args))
+        self.assertRaises(IndexError, lambda: mi.nth_product(0, 'ab', ()))
+
+        for element in [('a', 3), ('d', 0), ('a',), ('a', 0, 0)]:
+            self.assertRaises(
+                ValueError, lambda: mi.product_index(element, *args)
+            )
+
+
+class NthPermutationTests(TestCase):
+    def test_basic(self):
+        iterable = 'abcde'
+        for r in range(len(iterable) + 1):
+            for index, expected in enumerate(permutations(iterable, r)):
+                actual = mi.nth_permutation(iterable, r, index)
+                self.assertEqual(actual, expected)
+                actual = mi.permutation_index(expected, iterable)
+                self.assertEqual(actual, index)
+
+        actual = mi.nth_permutation(iterable, None, 119)
+        self.assertEqual(actual, ('e', 'd', 'c', 'b', 'a'))
+
+    def test_negative(self):
+        expected = list(permutations('abcd', 2))
+        for index in range(-len(expected), 0):
+            actual = mi.nth_permutation('abcd', 2, index)
+            self.assertEqual(actual, expected[index])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: mi.nth_permutation('ab', 3, 0))
+        self.assertRaises(ValueError, lambda: mi.nth_permutation('ab', -1, 0))
+        self.assertRaises(IndexError, lambda: mi.nth_permutation('ab', 2, 2))
+        self.assertRaises(IndexError, lambda: mi.nth_permutation('ab', 2, -3))
+
+        for element in ['aa', 'ac', 'abc']:
+            self.assertRaises(
+                ValueError, lambda: mi.permutation_index(element, 'ab')
+            )
+
+
+class CombinationIndexTests(TestCase):
+    def test_basic(self):
+        iterable = 'abcdefg'
+        for r in range(len(iterable) + 1):
+            for index, element in enumerate(combinations(iterable, r)):
+                actual = mi.combination_index(element, iterable)
+                self.assertEqual(actual, index)
+
+    def test_duplicates(self):
+        """The index of the first matching combination is returned."""
+        iterable = 'abab'
+        for element in combinations(iterable, 2):
+            actual = mi.combination_index(element, iterable)
+            expected = list(combinations(iterable, 2)).index(element)
+            self.assertEqual(actual, expected)
+
+    def test_invalid(self):
+        for element in ['ba', 'az', 'abcd']:
+            self.assertRaises(
+                ValueError, lambda: mi.combination_index(element, 'abc')
+            )
+
+
+class NthPowersetTests(TestCase):
+    def test_basic(self):
+        iterable = 'abcde'
+        expected = list(mi.powerset(iterable))
+        for index, element in enumerate(expected):
+            self.assertEqual(mi.nth_powerset(iterable, index), element)
+            self.assertEqual(mi.nth_powerset(iterable, index - 32), element)
+            self.assertEqual(mi.powerset_index(element, iterable), index)
+
+        self.assertEqual(mi.nth_powerset([], 0), ())
+
+    def test_invalid(self):
+        self.assertRaises(IndexError, lambda: mi.nth_powerset('abc', 8))
+        self.assertRaises(IndexError, lambda: mi.nth_powerset('abc', -9))
+        self.assertRaises(ValueError, lambda: mi.powerset_index('ca', 'abc'))
+
+
+class NthDistinctPermutationTests(TestCase):
+    def test_basic(self):
+        iterable = 'aabbbc'
+        for r in [None] + list(range(len(iterable) + 1)):
+            expected = list(mi.distinct_permutations(iterable, r))
+            for index, element in enumerate(expected):
+                actual = mi.nth_distinct_permutation(iterable, r, index)
+                self.assertEqual(actual, element)
+                actual = mi.distinct_permutation_index(element, iterable)
+                self.assertEqual(actual, index)
+
+    def test_unsortable(self):
+        iterable = [{'a': 1}, [0], {'a': 1}, [0], 'x']
+        expected = list(mi.distinct_permutations(iterable))
+        for index, element in enumerate(expected):
+            actual = mi.nth_distinct_permutation(iterable, None, index)
+            self.assertEqual(actual, element)
+            actual = mi.distinct_permutation_index(element, iterable)
+            self.assertEqual(actual, index)
+
+    def test_large(self):
+        """Indexes can be computed without enumerating the permutations."""
+        iterable = list(range(10)) * 10
+        index = 10 ** 80
+        element = mi.nth_distinct_permutation(iterable, None, index)
+        self.assertEqual(sorted(element), sorted(iterable))
+        actual = mi.distinct_permutation_index(element, iterable)
+        self.assertEqual(actual, index)
+
+    def test_invalid(self):
+        func = mi.nth_distinct_permutation
+        self.assertRaises(ValueError, lambda: func('aab', 4, 0))
+        self.assertRaises(ValueError, lambda: func('aab', -1, 0))
+        self.assertRaises(IndexError, lambda: func('aab', None, 3))
+        self.assertRaises(IndexError, lambda: func('aab', None, -4))
+
+        func = mi.distinct_permutation_index
+        for element in ['bb', 'abc', 'aaab']:
+            self.assertRaises(ValueError, lambda: func(element, 'aab'))
+
 
 class IlenTests(TestCase):
     def test_ilen(self):
@@ -533,6 +925,105 @@ class WithIterTests(TestCase):
         self.assertTrue(s.closed)
 
 
+class ReadRecordsTests(TestCase):
+    data = b'alpha\x1ebeta\x1e\x1egamma-delta\x1eepsilon\x1e'
+
+    def test_delimiter(self):
+        expected = self.data.split(b'\x1e')
+        for buffer_size in (1, 2, 3, 5, 8, 1 << 20):
+            actual = list(
+                mi.read_records(
+                    BytesIO(self.data), delimiter=b'\x1e',
+                    buffer_size=buffer_size
+                )
+            )
+            self.assertEqual(actual, expected)
+
+    def test_multibyte_delimiter(self):
+        """Delimiters that straddle the blocks should be found"""
+        data = b'ab--cd---ef--'
+        for buffer_size in range(1, len(data) + 2):
+            actual = list(
+                mi.read_records(
+                    BytesIO(data), delimiter=b'--', buffer_size=buffer_size
+                )
+            )
+            self.assertEqual(actual, data.split(b'--'))
+
+    def test_long_records(self):
+        """Records longer than the buffer should be read whole"""
+        data = b'x' * 1000 + b'-+-' + b'y-+' * 300 + b'-+-' + b'z'
+        for buffer_size in (1, 2, 7, 64):
+            actual = list(
+                mi.read_records(
+                    BytesIO(data), delimiter=b'-+-', buffer_size=buffer_size
+                )
+            )
+            self.assertEqual(actual, data.split(b'-+-'))
+            actual = list(
+                mi.read_records(
+                    BytesIO(data), length=700, buffer_size=buffer_size
+                )
+            )
+            self.assertEqual(actual, list(mi.sliced(data, 700)))
+
+    def test_length(self):
+        data = b'0123456789'
+        for buffer_size in (1, 3, 4, 7, 100):
+            actual = list(
+                mi.read_records(
+                    BytesIO(data), length=4, buffer_size=buffer_size
+                )
+            )
+            self.assertEqual(actual, [b'0123', b'4567', b'89'])
+
+    def test_empty(self):
+        self.assertEqual(
+            list(mi.read_records(BytesIO(b''), delimiter=b',')), [b'']
+        )
+        self.assertEqual(list(mi.read_records(BytesIO(b''), length=2)), [])
+
+    def test_text(self):
+        f = StringIO('a\nbb\nccc')
+        actual = list(mi.read_records(f, delimiter='\n', buffer_size=2))
+        self.assertEqual(actual, ['a', 'bb', 'ccc'])
+
+    def test_buffer(self):
+        data = bytearray(self.data)
+        actual = list(mi.read_records(data, delimiter=b'\x1e'))
+        self.assertEqual(actual, data.split(b'\x1e'))
+        actual = list(mi.read_records(data, length=16))
+        self.assertEqual(actual, list(mi.sliced(data, 16)))
+
+    def test_path(self):
+        with NamedTemporaryFile(delete=False) as f:
+            f.write(self.data)
+        try:
+            records = mi.read_records(f.name, delimiter=b'\x1e')
+            self.assertEqual(list(records), self.data.split(b'\x1e'))
+
+            with open(f.name, 'rb') as g:
+                m = mmap(g.fileno(), 0, access=ACCESS_READ)
+                try:
+                    records = mi.read_records(m, delimiter=b'\x1e')
+                    self.assertEqual(list(records), self.data.split(b'\x1e'))
+                finally:
+                    m.close()
+        finally:
+            remove(f.name)
+
+    def test_invalid(self):
+        for kwargs in [
+            {},
+            {'delimiter': b',', 'length': 1},
+            {'delimiter': b''},
+            {'length': 0},
+            {'length': 1, 'buffer_size': 0},
+        ]:
+            with self.assertRaises(ValueError):
+                mi.read_records(BytesIO(b''), **kwargs)
+
+
 class OneTests(TestCase):
     def test_basic(self):
         it = iter(['item'])
@@ -598,6 +1089,71 @@ class IntersperseTest(TestCase):
         )
 
 
+class UnhashableKey(object):
+    """Unhashable key that _freeze() can't convert"""
+    __hash__ = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class UniqueInWindowTests(TestCase):
+    """Tests for ``unique_in_window()``"""
+
+    def test_basic(self):
+        iterable = [0, 1, 1, 0, 2, 0, 3, 1, 0, 0]
+        for n, expected in [
+            (1, [0, 1, 0, 2, 0, 3, 1, 0]),
+            (2, [0, 1, 0, 2, 3, 1, 0]),
+            (3, [0, 1, 2, 3, 1]),
+            (10, [0, 1, 2, 3]),
+        ]:
+            actual = list(mi.unique_in_window(iterable, n))
+            self.assertEqual(actual, expected)
+
+    def test_key(self):
+        iterable = ['a', 'B', 'A', 'c', 'b', 'C', 'd', 'A']
+        key = lambda x: x.lower()
+        actual = list(mi.unique_in_window(iterable, 3, key=key))
+        self.assertEqual(actual, ['a', 'B', 'c', 'd', 'A'])
+
+    def test_unhashable(self):
+        iterable = [[1], {'a': 1}, [1], [2], {'a': 1}, [1]]
+        actual = list(mi.unique_in_window(iterable, 2))
+        self.assertEqual(actual, [[1], {'a': 1}, [2], {'a': 1}, [1]])
+
+    def test_unconvertible(self):
+        # Keys that _freeze can't convert are compared one by one
+        iterable = [0, 1, 1, 0, 2, 0, 3, 1, 0, 0]
+        for n, expected in [
+            (1, [0, 1, 0, 2, 0, 3, 1, 0]),
+            (2, [0, 1, 0, 2, 3, 1, 0]),
+            (3, [0, 1, 2, 3, 1]),
+        ]:
+            actual = list(mi.unique_in_window(iterable, n, key=UnhashableKey))
+            self.assertEqual(actual, expected)
+
+        iterable = [[UnhashableKey(0)], 1, [UnhashableKey(0)]]
+        self.assertEqual(len(list(mi.unique_in_window(iterable, 2))), 2)
+
+    def test_forgets(self):
+        # Items are yielded again once they've left the window, however
+        # long the input is
+        iterable = 'abcdef' * 100
+        for key in (None, lambda x: [x], UnhashableKey):
+            actual = list(mi.unique_in_window(iterable, 5, key=key))
+            self.assertEqual(actual, list(iterable))
+            actual = list(mi.unique_in_window(iterable, 6, key=key))
+            self.assertEqual(actual, list('abcdef'))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(mi.unique_in_window('abc', 0))
+
+
 class UniqueToEachTests(TestCase):
     """Tests for ``unique_to_each()``"""
 
@@ -683,6 +1239,64 @@ class WindowedTests(TestCase):
             list(mi.windowed(iterable, 3, step=0))
 
 
+class WindowedViewTests(TestCase):
+    """Tests for ``windowed_view()``"""
+
+    def test_matches_windowed(self):
+        """The views should have the same items as windowed()'s tuples."""
+        for size, n, step in product(range(9), range(6), range(1, 6)):
+            expected = list(mi.windowed(range(size), n, '!', step))
+            actual = [
+                tuple(w) for w in mi.windowed_view(range(size), n, '!', step)
+            ]
+            self.assertEqual(actual, expected)
+
+    def test_batch(self):
+        """Batches should hold valid windows until the next batch."""
+        for size, n, step, batch in product(
+            range(9), range(1, 5), range(1, 4), range(1, 4)
+        ):
+            expected = list(mi.windowed(range(size), n, '!', step))
+            actual = []
+            for windows in mi.windowed_view(range(size), n, '!', step, batch):
+                self.assertTrue(1 <= len(windows) <= batch)
+                actual.extend(tuple(w) for w in windows)
+            self.assertEqual(actual, expected)
+
+    def test_view(self):
+        w = mi.last(mi.windowed_view(range(10), 5))
+        self.assertEqual(len(w), 5)
+        self.assertEqual(w[0], 5)
+        self.assertEqual(w[-1], 9)
+        self.assertEqual(w[1:3], [6, 7])
+        self.assertEqual(w[::-2], [9, 7, 5])
+        self.assertEqual(repr(w), '_WindowView([5, 6, 7, 8, 9])')
+        self.assertRaises(IndexError, lambda: w[5])
+        self.assertRaises(IndexError, lambda: w[-6])
+
+    def test_slices(self):
+        """Slices, including ones with negative steps and bounds outside of
+        the window, should match slices of a list.
+
+        """
+        indexes = list(range(-12, 13)) + [None]
+        steps = [None, 1, 2, 3, -1, -2, -3]
+        for i, w in enumerate(mi.windowed_view(range(10), 5)):
+            expected_window = list(range(i, i + 5))
+            for start, stop, step in product(indexes, indexes, steps):
+                index = slice(start, stop, step)
+                self.assertEqual(w[index], expected_window[index], index)
+
+    def test_zero(self):
+        actual = [tuple(w) for w in mi.windowed_view([1, 2, 3], 0)]
+        self.assertEqual(actual, [()])
+
+    def test_invalid(self):
+        for n, step, batch in [(-1, 1, None), (3, 0, None), (3, 1, 0)]:
+            with self.assertRaises(ValueError):
+                list(mi.windowed_view([1, 2, 3], n, step=step, batch=batch))
+
+
 class SubstringsTests(TestCase):
     def test_basic(self):
         iterable = (x for x in range(4))
@@ -715,6 +1329,61 @@ class SubstringsTests(TestCase):
         expected = []
         self.assertEqual(actual, expected)
 
+        actual = list(mi.substrings(iter([]), distinct=True))
+        self.assertEqual(actual, expected)
+
+    def test_lengths(self):
+        iterable = iter(range(5))
+        actual = list(mi.substrings(iterable, min_len=2, max_len=3))
+        expected = [
+            (0, 1), (1, 2), (2, 3), (3, 4), (0, 1, 2), (1, 2, 3), (2, 3, 4)
+        ]
+        self.assertEqual(actual, expected)
+
+        actual = list(mi.substrings(range(3), max_len=1))
+        self.assertEqual(actual, [(0,), (1,), (2,)])
+        self.assertEqual(list(mi.substrings(range(3), min_len=4)), [])
+
+        with self.assertRaises(ValueError):
+            list(mi.substrings(range(3), min_len=0))
+
+    def test_distinct(self):
+        def distinct_substrings(seq, min_len, max_len):
+            seen = set()
+            for s in mi.substrings(seq, min_len, max_len):
+                if s not in seen:
+                    seen.add(s)
+                    yield s
+
+        for seq in [
+            'mississippi',
+            'aaaaaaa',
+            'abcabcabcx',
+            'GATTACAGATTACATTAG',
+            [1, 2, 1, 2, 3, 1, 2],
+        ]:
+            for min_len, max_len in [(1, None), (2, 4), (3, 3)]:
+                actual = list(
+                    mi.substrings(iter(seq), min_len, max_len, distinct=True)
+                )
+                expected = list(distinct_substrings(seq, min_len, max_len))
+                self.assertEqual(actual, expected)
+
+    def test_indexes(self):
+        seq = 'abab'
+        actual = list(mi.substrings(seq, indexes=True))
+        expected = [
+            (0, 1), (1, 2), (2, 3), (3, 4),
+            (0, 2), (1, 3), (2, 4),
+            (0, 3), (1, 4),
+            (0, 4),
+        ]
+        self.assertEqual(actual, expected)
+
+        actual = list(mi.substrings(seq, distinct=True, indexes=True))
+        expected = [(0, 1), (1, 2), (0, 2), (1, 3), (0, 3), (1, 4), (0, 4)]
+        self.assertEqual(actual, expected)
+
     def test_order(self):
         iterable = [2, 0, 1]
         actual = list(mi.substrings(iterable))
@@ -760,6 +1429,181 @@ class BucketTests(TestCase):
         self.assertNotIn(0, D._cache)  # Don't store non-valid entries
         self.assertEqual(list(D[0]), [])
 
+    def test_max_cached_raise(self):
+        D = mi.bucket(range(10), key=lambda x: x % 3, max_cached=4)
+        self.assertEqual(next(D[0]), 0)
+        with self.assertRaises(RuntimeError):
+            list(D[0])
+        self.assertEqual(D.cache_info()['cached'], 4)
+
+        D = mi.bucket(range(10), key=lambda x: x % 3, max_cached_per_key=2)
+        with self.assertRaises(RuntimeError):
+            list(D[0])
+
+    def test_raise_put_back(self):
+        # The item that didn't fit is read again once there's room
+        D = mi.bucket(range(10), key=lambda x: x % 2, max_cached=2)
+        it = D[0]
+        self.assertEqual([next(it), next(it), next(it)], [0, 2, 4])
+        with self.assertRaises(RuntimeError):
+            next(it)
+        self.assertEqual(list(D[1]), [1, 3, 5, 7, 9])
+        self.assertEqual(list(D[0]), [6, 8])
+
+    def test_drop_oldest_per_key(self):
+        D = mi.bucket(
+            range(12),
+            key=lambda x: x % 3,
+            max_cached_per_key=2,
+            on_overflow='drop_oldest',
+        )
+        self.assertEqual(list(D[0]), [0, 3, 6, 9])
+        self.assertEqual(list(D[1]), [7, 10])
+        self.assertEqual(list(D[2]), [8, 11])
+        self.assertEqual(D.cache_info()['dropped'], 4)
+
+    def test_drop_oldest_global(self):
+        D = mi.bucket(
+            range(12),
+            key=lambda x: x % 3,
+            max_cached=3,
+            on_overflow='drop_oldest',
+        )
+        self.assertEqual(list(D[0]), [0, 3, 6, 9])
+        # The three newest items survive, regardless of their keys
+        self.assertEqual(list(D[1]), [10])
+        self.assertEqual(list(D[2]), [8, 11])
+        info = D.cache_info()
+        self.assertEqual(info['dropped'], 5)
+        self.assertEqual(info['peak_cached'], 3)
+        self.assertEqual(info['cached'], 0)
+
+    def test_drop_oldest_zero(self):
+        D = mi.bucket(
+            range(6), key=lambda x: x % 2, max_cached=0,
+            on_overflow='drop_oldest'
+        )
+        self.assertEqual(list(D[0]), [0, 2, 4])
+        self.assertEqual(list(D[1]), [])
+        self.assertEqual(D.cache_info()['dropped'], 3)
+
+    def test_drop_oldest_in(self):
+        D = mi.bucket(
+            range(20),
+            key=lambda x: x % 4,
+            max_cached=4,
+            on_overflow='drop_oldest',
+        )
+        self.assertIn(3, D)
+        self.assertEqual(D.cache_info()['keys'], {0: 1, 1: 1, 2: 1, 3: 1})
+        # Only the four newest items with other keys are kept
+        self.assertEqual(list(D[0]), [0, 4, 8, 12, 16])
+        self.assertEqual(list(D[1]), [17])
+        self.assertEqual(list(D[2]), [18])
+        self.assertEqual(list(D[3]), [15, 19])
+
+    def test_spill(self):
+        iterable = [(i % 3, i) for i in range(30)]
+        D = mi.bucket(
+            iterable,
+            key=itemgetter(0),
+            max_cached=5,
+            max_cached_per_key=2,
+            on_overflow='spill',
+        )
+        self.assertEqual(list(D[2]), iterable[2::3])
+        info = D.cache_info()
+        self.assertEqual(info['cached'], 4)
+        self.assertEqual(info['spilled'], 16)
+        self.assertEqual(info['keys'], {0: 10, 1: 10})
+
+        self.assertIn(1, D)
+        self.assertEqual(list(D[1]), iterable[1::3])
+        self.assertEqual(list(D[0]), iterable[0::3])
+        self.assertEqual(D.cache_info()['keys'], {})
+
+    def test_spill_reclaimed(self):
+        # Once every spilled item has been read back, the spill file is
+        # emptied, so it doesn't keep growing on a long stream
+        D = mi.bucket(
+            count(), key=lambda x: x % 2, max_cached=0, on_overflow='spill'
+        )
+        evens = D[0]
+        odds = D[1]
+        for i in range(0, 100, 4):
+            self.assertEqual([next(evens), next(evens)], [i, i + 2])
+            self.assertEqual(len(D._spill), 1)
+            self.assertEqual([next(odds), next(odds)], [i + 1, i + 3])
+            self.assertEqual(len(D._spill), 0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            mi.bucket([], key=abs, max_cached=-1)
+        with self.assertRaises(ValueError):
+            mi.bucket([], key=abs, on_overflow='ignore')
+
+
+class FanoutTests(TestCase):
+    """Tests for ``fanout()``"""
+
+    def test_callables(self):
+        sinks = {0: [], 1: [], 2: []}
+        mi.fanout(
+            range(10),
+            lambda x: x % 3,
+            {k: v.append for k, v in sinks.items()},
+        )
+        self.assertEqual(
+            sinks, {0: [0, 3, 6, 9], 1: [1, 4, 7], 2: [2, 5, 8]}
+        )
+
+    def test_consumers(self):
+        totals = {}
+
+        @mi.consumer
+        def total(k):
+            totals[k] = 0
+            while True:
+                totals[k] += yield
+
+        mi.fanout(range(10), lambda x: x % 2, {0: total(0), 1: total(1)})
+        self.assertEqual(totals, {0: 20, 1: 25})
+
+    def test_default(self):
+        matched = []
+        unmatched = []
+        key = lambda x: x.islower()
+        mi.fanout('aBcD', key, {True: matched.append}, unmatched.append)
+        self.assertEqual(matched, ['a', 'c'])
+        self.assertEqual(unmatched, ['B', 'D'])
+
+        # Without a default, unmatched items are discarded
+        matched = []
+        mi.fanout('aBcD', key, {True: matched.append})
+        self.assertEqual(matched, ['a', 'c'])
+
+    def test_defaultdict(self):
+        created = []
+
+        def new_sink():
+            created.append([])
+            return created[-1].append
+
+        sinks = defaultdict(new_sink)
+        mi.fanout('abacb', lambda x: x, sinks)
+        self.assertEqual(created, [['a', 'a'], ['b', 'b'], ['c']])
+
+    def test_single_pass(self):
+        # Each item is sent as soon as it's read
+        iterable = iter(range(6))
+        seen = []
+
+        def sink(item):
+            seen.append((item, next(iterable, None)))
+
+        mi.fanout(iterable, lambda x: x % 2, {0: sink, 1: sink})
+        self.assertEqual(seen, [(0, 1), (2, 3), (4, 5)])
+
 
 class SpyTests(TestCase):
     """Tests for ``spy()``"""
@@ -864,6 +1708,29 @@ class TestCollapse(TestCase):
         expected = [1, [2], 3, [4, (5,)], 'ab']
         self.assertEqual(actual, expected)
 
+    def test_collapse_deep(self):
+        """Nesting deeper than the recursion limit should be supported"""
+        l = [0]
+        for i in range(1, 10000):
+            l = [l, i]
+        self.assertEqual(list(mi.collapse(l)), list(range(10000)))
+        self.assertEqual(list(mi.collapse(l, levels=9998))[:2], [[0], 1])
+
+    def test_collapse_leaves(self):
+        """Leaves of the same type as iterable nodes should be collapsed
+        correctly.
+
+        """
+        l = [1, 'ab', (), [2, ()], iter([3, [4]]), {5: None}]
+        self.assertEqual(list(mi.collapse(l)), [1, 'ab', 2, 3, 4, 5])
+
+    @skipIf(numpy is None, 'numpy is required')
+    def test_collapse_zero_dimensional(self):
+        l = [numpy.array([1, 2]), numpy.array(3)]
+        actual = list(mi.collapse(l))
+        self.assertEqual(actual, [1, 2, 3])
+        self.assertEqual(actual[2].shape, ())
+
 
 class SideEffectTests(TestCase):
     """Tests for ``side_effect()``"""
@@ -955,6 +1822,72 @@ class SlicedTests(TestCase):
         with self.assertRaises(TypeError):
             list(mi.sliced(seq, 3))
 
+    def test_falsy_slices(self):
+        """Slices that are falsy shouldn't stop the iteration"""
+        class FalsySlices(object):
+            def __init__(self, items):
+                self.items = items
+
+            def __len__(self):
+                return len(self.items)
+
+            def __getitem__(self, index):
+                return FalsySlices(self.items[index])
+
+            def __bool__(self):
+                return False
+
+            __nonzero__ = __bool__
+
+        seq = FalsySlices('ABCDE')
+        actual = [s.items for s in mi.sliced(seq, 2)]
+        self.assertEqual(actual, ['AB', 'CD', 'E'])
+
+    def test_step(self):
+        seq = 'ABCDEFGHIJ'
+        for n, step, expected in [
+            (4, 2, ['ABCD', 'CDEF', 'EFGH', 'GHIJ']),
+            (4, 3, ['ABCD', 'DEFG', 'GHIJ']),
+            (4, 5, ['ABCD', 'FGHI']),
+            (2, 4, ['AB', 'EF', 'IJ']),
+            (3, 4, ['ABC', 'EFG', 'IJ']),
+            (3, 1, ['ABC', 'BCD', 'CDE', 'DEF', 'EFG', 'FGH', 'GHI', 'HIJ']),
+            (20, 1, ['ABCDEFGHIJ']),
+        ]:
+            actual = list(mi.sliced(seq, n, step=step))
+            self.assertEqual(actual, expected)
+
+        self.assertEqual(list(mi.sliced('', 3, step=1)), [])
+
+    def test_buffer(self):
+        data = bytearray(b'ABCDEFGHIJ')
+        slices = list(mi.sliced(data, 4, buffer=True))
+        self.assertTrue(all(isinstance(s, memoryview) for s in slices))
+        self.assertEqual(
+            [s.tobytes() for s in slices], [b'ABCD', b'EFGH', b'IJ']
+        )
+
+        # The slices are views, not copies
+        data[0:1] = b'Z'
+        self.assertEqual(slices[0].tobytes(), b'ZBCD')
+
+        with self.assertRaises(TypeError):
+            mi.sliced([1, 2, 3], 2, buffer=True)
+
+    @skipIf(version_info < (3,), 'arrays support memoryview on Python 3')
+    def test_buffer_array(self):
+        # Arrays are sliced by item
+        slices = mi.sliced(array('i', range(5)), 2, step=1, buffer=True)
+        self.assertEqual(
+            [s.tolist() for s in slices], [[0, 1], [1, 2], [2, 3], [3, 4]]
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            mi.sliced('ABC', 0)
+        with self.assertRaises(ValueError):
+            mi.sliced('ABC', 1, step=0)
+
 
 class SplitAtTests(TestCase):
     """Tests for ``split()``"""
@@ -1254,6 +2187,8 @@ class DistributeTest(TestCase):
             self.assertEqual(
                 [list(x) for x in mi.distribute(n, iterable)], expected
             )
+            children = mi.distribute(n, iterable, thread_safe=True)
+            self.assertEqual([list(x) for x in children], expected)
 
     def test_large_n(self):
         iterable = [1, 2, 3, 4]
@@ -1262,6 +2197,37 @@ class DistributeTest(TestCase):
             [[1], [2], [3], [4], [], []]
         )
 
+    def test_single_pass(self):
+        """The source should be read once, and only as far as needed"""
+        for thread_safe in (False, True):
+            seen = []
+            iterable = mi.side_effect(seen.append, count())
+            first, second, third = mi.distribute(
+                3, iterable, thread_safe=thread_safe
+            )
+            self.assertEqual(mi.take(2, second), [1, 4])
+            self.assertEqual(seen, [0, 1, 2, 3, 4])
+            self.assertEqual(mi.take(3, first), [0, 3, 6])
+            self.assertEqual(seen, [0, 1, 2, 3, 4, 5, 6])
+            self.assertEqual(mi.take(2, third), [2, 5])
+            self.assertEqual(seen, [0, 1, 2, 3, 4, 5, 6])
+
+    def test_thread_safe(self):
+        n = 4
+        children = mi.distribute(n, range(10000), thread_safe=True)
+        results = [[] for _ in range(n)]
+        threads = [
+            Thread(target=results[i].extend, args=(children[i],))
+            for i in range(n)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for i in range(n):
+            self.assertEqual(results[i], list(range(i, 10000, n)))
+
 
 class StaggerTest(TestCase):
     """Tests for ``stagger()``"""
@@ -1378,6 +2344,100 @@ class UnzipTests(TestCase):
         self.assertEqual(list(xs), [1, 3, 6])
         self.assertEqual(list(ys), [2, 4, 7])
 
+    def test_materialize_list(self):
+        zipped = zip(range(3000), range(1, 3001), range(2, 3002))
+        xs, ys, zs = mi.unzip(zipped, materialize='list')
+        self.assertEqual(xs, list(range(3000)))
+        self.assertEqual(ys, list(range(1, 3001)))
+        self.assertEqual(zs, list(range(2, 3002)))
+
+        self.assertEqual(mi.unzip([], materialize='list'), ())
+
+    def test_materialize_array(self):
+        zipped = zip(range(5), [0.5] * 5)
+        xs, ys = mi.unzip(zipped, materialize='array', typecodes='bd')
+        self.assertEqual(xs, array('b', range(5)))
+        self.assertEqual(ys, array('d', [0.5] * 5))
+
+        xs, ys = mi.unzip([(1, 2), (3, 4)], 'array', typecodes='l')
+        self.assertEqual(xs, array('l', [1, 3]))
+        self.assertEqual(ys, array('l', [2, 4]))
+
+        for typecodes in (None, 'bdd'):
+            with self.assertRaises(ValueError):
+                mi.unzip([(1, 2)], materialize='array', typecodes=typecodes)
+
+    def test_materialize_improperly_zipped(self):
+        # The columns should stop at the same places as they do without
+        # materialize, in any batch.
+        rows = [(1, 2, 3)] * 5 + [(4, 5), (6, 7, 8), (9,), (10, 11, 12)]
+        expected = [list(column) for column in mi.unzip(iter(rows))]
+        self.assertEqual(
+            expected, [[1] * 5 + [4, 6, 9, 10], [2] * 5 + [5, 7], [3] * 5]
+        )
+        self.assertEqual(
+            list(mi.unzip(iter(rows), materialize='list')), expected
+        )
+        for batch_size in (1, 2, 3, 100):
+            batches = list(mi.unzip(iter(rows), batch_size=batch_size))
+            actual = [
+                list(chain.from_iterable(column))
+                for column in zip(*batches)
+            ]
+            self.assertEqual(actual, expected)
+
+    def test_batch_size(self):
+        zipped = zip(range(5), 'abcde')
+        actual = list(mi.unzip(zipped, batch_size=2))
+        self.assertEqual(
+            actual,
+            [((0, 1), ('a', 'b')), ((2, 3), ('c', 'd')), ((4,), ('e',))]
+        )
+
+        actual = list(
+            mi.unzip([(1, 2)] * 3, 'array', typecodes='i', batch_size=2)
+        )
+        self.assertEqual(
+            actual,
+            [
+                (array('i', [1, 1]), array('i', [2, 2])),
+                (array('i', [1]), array('i', [2])),
+            ]
+        )
+
+        self.assertEqual(list(mi.unzip([], batch_size=2)), [])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            mi.unzip([(1, 2)], materialize='tuple')
+        with self.assertRaises(ValueError):
+            mi.unzip([(1, 2)], batch_size=0)
+
+
+class TrackedValue(object):
+    """Value that keeps count of how many of its instances exist, including
+    ones that were unpickled."""
+    live = peak = 0
+
+    def __init__(self, value):
+        self.value = value
+        self._track()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._track()
+
+    def _track(self):
+        cls = type(self)
+        cls.live += 1
+        cls.peak = max(cls.peak, cls.live)
+
+    def __del__(self):
+        type(self).live -= 1
+
+    def __lt__(self, other):
+        return self.value < other.value
+
 
 class SortTogetherTest(TestCase):
     """Tests for sort_together()"""
@@ -1468,6 +2528,73 @@ class SortTogetherTest(TestCase):
             ]
         )
 
+    def test_columnar(self):
+        iterables = [
+            ['GA', 'GA', 'GA', 'CT', 'CT', 'CT', 'MA'],
+            ['May', 'Aug.', 'May', 'June', 'July', 'July'],
+            (97, 20, 100, 70, 100, 20, 0),
+        ]
+        for key_list in [(0,), (0, 1), (2, 1), (1, 0, 2)]:
+            for reverse in (False, True):
+                expected = mi.sort_together(iterables, key_list, reverse)
+                actual = mi.sort_together(
+                    [iterables[0], iter(iterables[1]), iterables[2]],
+                    key_list,
+                    reverse,
+                    columnar=True,
+                )
+                self.assertEqual(actual, [list(c) for c in expected])
+
+        self.assertEqual(mi.sort_together([], columnar=True), [])
+        self.assertEqual(
+            mi.sort_together([[], [1]], columnar=True), [[], []]
+        )
+        self.assertRaises(
+            IndexError,
+            lambda: mi.sort_together(iterables, (5,), columnar=True)
+        )
+
+    def test_columnar_arrays(self):
+        iterables = [array('d', [2.5, 1.5, 0.5]), array('b', [1, 2, 3])]
+        actual = mi.sort_together(iterables, columnar=True)
+        self.assertEqual(
+            actual, [array('d', [0.5, 1.5, 2.5]), array('b', [3, 2, 1])]
+        )
+
+    def test_max_run(self):
+        keys = [(i * 7) % 10 for i in range(50)]
+        for max_run in (1, 3, 7, 50, 100):
+            for reverse in (False, True):
+                expected = list(zip(*mi.sort_together(
+                    [keys, range(50), count()], reverse=reverse
+                )))
+                actual = mi.sort_together(
+                    [keys, range(50), count()],
+                    reverse=reverse,
+                    max_run=max_run,
+                )
+                # Stable, like sorted()
+                self.assertEqual(list(actual), expected)
+
+        self.assertEqual(list(mi.sort_together([], max_run=2)), [])
+
+    def test_max_run_memory(self):
+        """While the runs are merged, only about max_run rows should be in
+        memory"""
+        values = [(i * 37) % 100 for i in range(100)]
+        TrackedValue.live = TrackedValue.peak = 0
+        iterable = (TrackedValue(v) for v in values)
+        actual = mi.sort_together([iterable], max_run=10)
+        self.assertLessEqual(TrackedValue.peak, 12)
+        self.assertEqual([row[0].value for row in actual], sorted(values))
+        self.assertLessEqual(TrackedValue.peak, 21)
+
+    def test_max_run_invalid(self):
+        with self.assertRaises(ValueError):
+            mi.sort_together([[1, 2]], max_run=0)
+        with self.assertRaises(ValueError):
+            mi.sort_together([[1, 2]], columnar=True, max_run=2)
+
 
 class DivideTest(TestCase):
     """Tests for divide()"""
@@ -1496,6 +2623,89 @@ class DivideTest(TestCase):
             [[1], [2], [3], [4], [], []]
         )
 
+    def test_sequence(self):
+        """Sequences should be read by index rather than copied"""
+        iterable = range(10 ** 12)
+        first, second, third = mi.divide(3, iterable)
+        self.assertEqual(mi.take(2, second), [333333333334, 333333333335])
+        self.assertEqual(mi.take(2, third), [666666666667, 666666666668])
+
+        seq = [1, 2, 3, 4]
+        first, second = mi.divide(2, seq)
+        seq[3] = 5
+        self.assertEqual([list(first), list(second)], [[1, 2], [3, 5]])
+
+    def test_custom_sequence(self):
+        """Sequences should be read by index as the parts are consumed"""
+        class Squares(Sequence):
+            def __init__(self, size):
+                self.size = size
+                self.reads = 0
+
+            def __len__(self):
+                return self.size
+
+            def __getitem__(self, index):
+                if not (0 <= index < self.size):
+                    raise IndexError(index)
+                self.reads += 1
+                return index * index
+
+        seq = Squares(1000000)
+        parts = mi.divide(4, seq)
+        self.assertEqual(seq.reads, 0)
+        self.assertEqual(next(parts[1]), 250000 ** 2)
+        self.assertEqual(seq.reads, 1)
+
+    def test_shrink(self):
+        """Parts that go past the end of a shortened sequence should raise
+        IndexError"""
+        seq = [1, 2, 3, 4]
+        first, second = mi.divide(2, seq)
+        del seq[3:]
+        self.assertEqual(list(first), [1, 2])
+        self.assertRaises(IndexError, lambda: list(second))
+
+    def test_slow_indexing(self):
+        """Sequences without constant-time indexing should be copied"""
+        seq = deque([1, 2, 3, 4])
+        first, second = mi.divide(2, seq)
+        seq[3] = 5
+        self.assertEqual([list(first), list(second)], [[1, 2], [3, 4]])
+
+    def test_length(self):
+        iterable = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        for n in (1, 2, 3, 10, 12):
+            self.assertEqual(
+                [list(x) for x in mi.divide(n, iter(iterable), length=10)],
+                [list(x) for x in mi.divide(n, iterable)],
+            )
+
+    def test_length_lazy(self):
+        seen = []
+        iterable = mi.side_effect(seen.append, count())
+        first, second = mi.divide(2, iterable, length=10)
+        self.assertEqual(next(first), 0)
+        self.assertEqual(seen, [0])
+
+        # Consuming a later part stores the items for the earlier ones
+        self.assertEqual(next(second), 5)
+        self.assertEqual(seen, [0, 1, 2, 3, 4, 5])
+        self.assertEqual(list(first), [1, 2, 3, 4])
+        self.assertEqual(list(second), [6, 7, 8, 9])
+        self.assertEqual(seen, list(range(10)))
+
+    def test_length_mismatch(self):
+        actual = [list(x) for x in mi.divide(3, iter('abcd'), length=6)]
+        self.assertEqual(actual, [['a', 'b'], ['c', 'd'], []])
+
+        actual = [list(x) for x in mi.divide(2, iter('abcdef'), length=4)]
+        self.assertEqual(actual, [['a', 'b'], ['c', 'd']])
+
+        self.assertRaises(
+            ValueError, lambda: mi.divide(2, iter('ab'), length=-1)
+        )
+
 
 class TestAlwaysIterable(TestCase):
     """Tests for always_iterable()"""
@@ -1912,6 +3122,25 @@ class DifferenceTest(TestCase):
     def test_empty(self):
         self.assertEqual(list(mi.difference([])), [])
 
+    @skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        for dtype in ['int8', 'uint8', 'int64', 'float64']:
+            arr = numpy.array([0, 1, 3, 2, 10], dtype=dtype)
+            expected = list(mi.difference(arr, vectorize=False))
+            actual = list(mi.difference(arr))
+            self.assertEqual(actual, expected)
+            self.assertEqual(
+                [type(x) for x in actual], [type(x) for x in expected]
+            )
+
+        self.assertEqual(list(mi.difference(numpy.array([]))), [])
+        self.assertEqual(list(mi.difference(numpy.array([1]))), [1])
+
+        # Other functions use the generic path
+        arr = numpy.array([1, 2, 6, 24])
+        actual = list(mi.difference(arr, lambda x, y: x // y))
+        self.assertEqual(actual, [1, 2, 3, 4])
+
 
 class SeekableTest(TestCase):
     def test_exhaustion_reset(self):
@@ -1972,6 +3201,60 @@ class SeekableTest(TestCase):
         mi.take(10, s)
         self.assertEqual(list(elements), [str(n) for n in range(20)])
 
+    def test_maxlen(self):
+        iterable = [str(n) for n in range(10)]
+
+        s = mi.seekable(iterable, maxlen=4)
+        self.assertEqual(mi.take(6, s), iterable[:6])
+
+        elements = s.elements()
+        self.assertEqual(list(elements), iterable[2:6])
+        self.assertEqual(elements[-1], '5')
+        self.assertEqual(len(elements), 4)
+
+        s.seek(3)
+        self.assertEqual(mi.take(2, s), iterable[3:5])
+        self.assertEqual(list(elements), iterable[2:6])  # Not advanced
+
+        s.seek(8)
+        self.assertEqual(list(elements), iterable[4:8])
+        self.assertEqual(list(s), iterable[8:])
+        self.assertEqual(list(elements), iterable[6:])
+
+        s.seek(6)
+        self.assertEqual(list(s), iterable[6:])
+
+        self.assertRaises(IndexError, lambda: s.seek(5))
+        self.assertEqual(list(s), [])
+
+    def test_maxlen_zero(self):
+        s = mi.seekable(range(5), maxlen=0)
+        self.assertEqual(mi.take(2, s), [0, 1])
+        self.assertEqual(list(s.elements()), [])
+        s.seek(2)
+        self.assertEqual(list(s), [2, 3, 4])
+        self.assertRaises(IndexError, lambda: s.seek(4))
+
+    def test_spill(self):
+        iterable = [{'n': n} for n in range(100)]
+
+        s = mi.seekable(iterable, maxlen=10, spill=True)
+        self.assertEqual(list(s), iterable)
+        self.assertEqual(list(s.elements()), iterable[90:])
+
+        for index in (0, 50, 85, 95):
+            s.seek(index)
+            self.assertEqual(list(s), iterable[index:])
+
+        s.seek(42)
+        self.assertEqual(mi.take(3, s), iterable[42:45])
+        s.seek(150)
+        self.assertEqual(list(s), [])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: mi.seekable([], spill=True))
+        self.assertRaises(ValueError, lambda: mi.seekable([], maxlen=-1))
+
 
 class SequenceViewTests(TestCase):
     def test_init(self):
@@ -2028,6 +3311,68 @@ class SequenceViewTests(TestCase):
         self.assertEqual(seq.count('f'), 2)
 
 
+class LRUSetTests(TestCase):
+    def test_basic(self):
+        s = mi.LRUSet(3)
+        for item in 'abcd':
+            s.add(item)
+        self.assertEqual(len(s), 3)
+        self.assertNotIn('a', s)
+        self.assertIn('b', s)  # 'b' becomes the most recently used
+
+        s.add('e')
+        self.assertEqual([x in s for x in 'bcde'], [True, False, True, True])
+
+        # Adding an existing item refreshes it
+        s.add('b')
+        s.add('f')
+        self.assertEqual([x in s for x in 'bdef'], [True, False, True, True])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: mi.LRUSet(0))
+
+
+class BloomFilterTests(TestCase):
+    def test_basic(self):
+        b = mi.BloomFilter(1000, 0.01)
+        items = [str(i) for i in range(1000)]
+        for item in items:
+            b.add(item)
+        self.assertTrue(all(item in b for item in items))
+
+        false_positives = sum(str(i) in b for i in range(1000, 11000))
+        self.assertLess(false_positives, 300)
+
+    def test_unhashable(self):
+        b = mi.BloomFilter(10)
+        self.assertRaises(TypeError, lambda: b.add([]))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: mi.BloomFilter(0))
+        self.assertRaises(ValueError, lambda: mi.BloomFilter(10, 0))
+        self.assertRaises(ValueError, lambda: mi.BloomFilter(10, 1))
+
+
+class CountMinSketchTests(TestCase):
+    def test_basic(self):
+        c = mi.CountMinSketch(2000, 4)
+        expected = {str(i): i % 7 + 1 for i in range(500)}
+        for item, n in expected.items():
+            c.add(item, n)
+        errors = [c[item] - n for item, n in expected.items()]
+        self.assertTrue(all(e >= 0 for e in errors))
+        self.assertLess(sum(errors), 100)
+
+    def test_key(self):
+        c = mi.CountMinSketch(10, key=len)
+        c.add('ab')
+        self.assertEqual(c['xy'], 1)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: mi.CountMinSketch(0))
+        self.assertRaises(ValueError, lambda: mi.CountMinSketch(10, 0))
+
+
 class RunLengthTest(TestCase):
     def test_encode(self):
         iterable = (int(str(n)[0]) for n in count(800))
@@ -2159,6 +3504,64 @@ class MakeDecoratorTests(TestCase):
         self.assertEqual(list(it), ['0', '1', '2', '3', '4'])
 
 
+class NgramCountsTests(TestCase):
+    tokens = 'the cat sat on the mat and the cat ran'.split()
+
+    def expected(self, iterable, lengths):
+        ret = Counter()
+        for n in lengths:
+            if len(iterable) >= n:
+                ret.update(mi.windowed(iterable, n))
+        return ret
+
+    def test_exact(self):
+        for lengths in [1, [2], range(1, 5), [3, 1]]:
+            actual = mi.ngram_counts(iter(self.tokens), lengths)
+            expected = self.expected(
+                self.tokens, [lengths] if isinstance(lengths, int) else lengths
+            )
+            self.assertEqual(actual, expected)
+
+    def test_blocks(self):
+        # N-grams that span the input's blocks should be counted once
+        block_size = mi.more._NGRAM_BLOCK_SIZE
+        try:
+            for mi.more._NGRAM_BLOCK_SIZE in [1, 2, 3, 7]:
+                actual = mi.ngram_counts(iter(self.tokens), range(1, 5))
+                expected = self.expected(self.tokens, range(1, 5))
+                self.assertEqual(actual, expected)
+        finally:
+            mi.more._NGRAM_BLOCK_SIZE = block_size
+
+    def test_short(self):
+        actual = mi.ngram_counts('ab', [1, 3])
+        self.assertEqual(actual, Counter({('a',): 1, ('b',): 1}))
+        self.assertEqual(mi.ngram_counts([], 2), Counter())
+
+    def test_min_count(self):
+        actual = mi.ngram_counts(self.tokens, [1, 2], min_count=2)
+        expected = {('the',): 3, ('cat',): 2, ('the', 'cat'): 2}
+        self.assertEqual(actual, expected)
+
+    def test_sketch(self):
+        tokens = [str(i % 97) for i in range(2000)] + self.tokens
+        expected = self.expected(tokens, [1, 2, 3])
+        sketch = mi.ngram_counts(tokens, [1, 2, 3], width=4000)
+        self.assertIsInstance(sketch, mi.CountMinSketch)
+        errors = [sketch[k] - v for k, v in expected.items()]
+        self.assertTrue(all(e >= 0 for e in errors))
+        self.assertLess(sum(errors), len(errors))
+        self.assertEqual(sketch[('the', 'cat')], 2)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: mi.ngram_counts('ab', 0))
+        self.assertRaises(ValueError, lambda: mi.ngram_counts('ab', []))
+        self.assertRaises(
+            ValueError,
+            lambda: mi.ngram_counts('ab', 1, min_count=2, width=10)
+        )
+
+
 class MapReduceTests(TestCase):
     def test_default(self):
         iterable = (str(x) for x in range(5))
@@ -2191,6 +3594,87 @@ class MapReduceTests(TestCase):
         self.assertEqual(d, {False: [0, 0, 0], True: [1, 2, 1]})
         self.assertRaises(KeyError, lambda: d[None].append(1))
 
+    def test_combinefunc(self):
+        iterable = (str(x) for x in range(5))
+        keyfunc = lambda x: int(x) // 2
+        d = mi.map_reduce(iterable, keyfunc, int, combinefunc=mul)
+        self.assertEqual(d, {0: 0, 1: 6, 2: 4})
+        self.assertRaises(KeyError, lambda: d[None])
+
+        # reducefunc is applied to the combined values
+        d = mi.map_reduce(
+            range(5), keyfunc, reducefunc=str, combinefunc=add
+        )
+        self.assertEqual(d, {0: '1', 1: '5', 2: '4'})
+
+    def test_combinefunc_streaming(self):
+        # Values shouldn't be stored while they're combined
+        calls = []
+
+        def combinefunc(acc, value):
+            calls.append((acc, value))
+            return acc + value
+
+        iterable = iter(range(6))
+        for key, value in mi.map_reduce(
+            iterable, lambda x: x % 2, combinefunc=combinefunc
+        ).items():
+            self.assertEqual(value, 6 if key == 0 else 9)
+        self.assertEqual(calls, [(0, 2), (1, 3), (2, 4), (4, 5)])
+
+    def test_initfunc(self):
+        d = mi.map_reduce(
+            'abcABCa',
+            lambda x: x.lower(),
+            combinefunc=lambda acc, x: acc.add(x) or acc,
+            initfunc=set,
+        )
+        self.assertEqual(
+            d, {'a': {'a', 'A'}, 'b': {'b', 'B'}, 'c': {'c', 'C'}}
+        )
+        self.assertRaises(KeyError, lambda: d[None])
+
+        with self.assertRaises(ValueError):
+            mi.map_reduce('abc', lambda x: x.lower(), initfunc=set)
+
+    def test_top_k(self):
+        iterable = 'aabbbbcccdddde'
+        upper = lambda x: x.upper()
+        d = mi.map_reduce(iterable, upper, lambda x: 1, None, add, top_k=3)
+        self.assertEqual(d, {'B': 4, 'C': 3, 'D': 4})
+        self.assertRaises(KeyError, lambda: d[None])
+
+        d = mi.map_reduce(iterable, upper, reducefunc=len, top_k=1)
+        self.assertIn(d, [{'B': 4}, {'D': 4}])
+
+        self.assertEqual(mi.map_reduce(iterable, upper, top_k=0), {})
+        with self.assertRaises(ValueError):
+            mi.map_reduce(iterable, upper, top_k=-1)
+
+    @skipIf(futures is None, 'concurrent.futures is required')
+    def test_workers(self):
+        iterable = range(-20, 20)
+        for kwargs in [
+            {},
+            {'valuefunc': str},
+            {'combinefunc': add},
+            {'combinefunc': add, 'reducefunc': str, 'top_k': 3},
+        ]:
+            expected = mi.map_reduce(iterable, abs, **kwargs)
+            actual = mi.map_reduce(
+                iterable, abs, workers=2, chunk_size=7, **kwargs
+            )
+            self.assertEqual(actual, expected)
+            self.assertRaises(KeyError, lambda: actual[None])
+
+    def test_workers_invalid(self):
+        with self.assertRaises(ValueError):
+            mi.map_reduce(range(10), abs, workers=0)
+        with self.assertRaises(ValueError):
+            mi.map_reduce(
+                range(10), abs, combinefunc=add, initfunc=int, workers=2
+            )
+
 
 class RlocateTests(TestCase):
     def test_default_pred(self):
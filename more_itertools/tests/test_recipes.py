@@ -1,12 +1,17 @@
 import warnings
 from doctest import DocTestSuite
-from unittest import TestCase
+from unittest import TestCase, skipIf
 
 from itertools import combinations
 from six.moves import range
 
 import more_itertools as mi
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 def load_tests(loader, tests, ignore):
     # Add the doctests
@@ -36,6 +41,33 @@ class AccumulateTests(TestCase):
             list(mi.accumulate((1, 2, 3, 2, 1), func=max)), [1, 2, 3, 3, 3]
         )
 
+    @skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        """Vectorized results should match the item-by-item ones"""
+        from operator import add, mul
+
+        for dtype in ['int8', 'uint16', 'int64', 'float32', 'complex128']:
+            arr = numpy.arange(1, 20, dtype=dtype)
+            for func in (add, mul, max):
+                expected = list(mi.accumulate(arr, func, vectorize=False))
+                actual = list(mi.accumulate(arr, func))
+                self.assertEqual(actual, expected)
+                self.assertEqual(
+                    [type(x) for x in actual], [type(x) for x in expected]
+                )
+
+        self.assertEqual(list(mi.accumulate(numpy.array([]))), [])
+
+    @skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy_other_arrays(self):
+        """Arrays that aren't 1-D and numeric use the generic path"""
+        arr = numpy.array([[1, 2], [3, 4]])
+        actual = [x.tolist() for x in mi.accumulate(arr)]
+        self.assertEqual(actual, [[1, 2], [4, 6]])
+
+        arr = numpy.array(['a', 'b'], dtype=object)
+        self.assertEqual(list(mi.accumulate(arr)), ['a', 'ab'])
+
 
 class TakeTests(TestCase):
     """Tests for ``take()``"""
@@ -396,6 +428,62 @@ class UniqueEverseenTests(TestCase):
         u = mi.unique_everseen(iterable, key=lambda x: x)
         self.assertEqual(list(u), ['a', [1, 2, 3]])
 
+    def test_freezable(self):
+        """Lists, dicts, and sets should be compared by value, and equal
+        items of different types should be treated as the same item."""
+        iterable = [
+            {'a': [1, 2]}, {'a': [1, 2]}, {'a': (1, 2)}, [1, {2}], [1, {2}],
+            (1, {2}), (1, frozenset([2])), {3}, frozenset([3]),
+            bytearray(b'x'), b'x', [1.0, {2}],
+        ]
+        u = mi.unique_everseen(iterable)
+        self.assertEqual(
+            list(u),
+            [{'a': [1, 2]}, {'a': (1, 2)}, [1, {2}], (1, {2}), {3},
+             bytearray(b'x')]
+        )
+
+    def test_unfreezable(self):
+        """Unhashable items that can't be frozen are compared by equality"""
+        class Unhashable(object):
+            __hash__ = None
+
+            def __init__(self, value):
+                self.value = value
+
+            def __eq__(self, other):
+                if not isinstance(other, Unhashable):
+                    return NotImplemented
+                return self.value == other.value
+
+        a, b = Unhashable(1), Unhashable(2)
+        iterable = [a, [a], Unhashable(1), b, [b], [b], a]
+        self.assertEqual(list(mi.unique_everseen(iterable)), [a, [a], b, [b]])
+
+    def test_seen(self):
+        """A custom seen object should be used to store the keys"""
+        seen = set()
+        iterable = ['a', 'B', 'A', ['b'], ['b']]
+        u = mi.unique_everseen(iterable, key=lambda x: x, seen=seen)
+        self.assertEqual(list(u), ['a', 'B', 'A', ['b']])
+        self.assertEqual(len(seen), 4)
+
+        u = mi.unique_everseen('abcABC', key=str.lower, seen={'b'})
+        self.assertEqual(list(u), ['a', 'c'])
+
+    def test_lru_set(self):
+        iterable = [1, 2, 1, 3, 1, 2, 4, 3]
+        u = mi.unique_everseen(iterable, seen=mi.LRUSet(2))
+        self.assertEqual(list(u), [1, 2, 3, 2, 4, 3])
+
+    def test_bloom_filter(self):
+        iterable = [i % 500 for i in range(2000)]
+        u = mi.unique_everseen(iterable, seen=mi.BloomFilter(500, 0.001))
+        actual = list(u)
+        # There can be false positives, but never false negatives
+        self.assertEqual(len(actual), len(set(actual)))
+        self.assertGreater(len(actual), 490)
+
 
 class UniqueJustseenTests(TestCase):
     """Tests for ``unique_justseen()``"""